@@ -0,0 +1,139 @@
+"""End-to-end latency benchmark for the agent tools against the local replay server
+
+    python benchmarks/bench_tools.py --runs 20 --latency 0.08 --threads 8
+
+Starts stock_anaylsis_agent.replay in-process, points the agent at it and reports
+p50/p95/p99 per tool for cold runs (empty caches and bar store) and warm runs,
+the number of upstream calls each phase made, and concurrent throughput.
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TICKERS = [('AAPL', 'Apple'), ('MSFT', 'Microsoft'), ('NVDA', 'NVIDIA'), ('TSLA', 'Tesla'),
+           ('AMZN', 'Amazon'), ('GOOGL', 'Alphabet'), ('META', 'Meta'), ('JPM', 'JPMorgan Chase')]
+QUERIES = ['How is Tesla doing today?', 'Why did NVDA drop this week?', "What's the latest on Apple stock?",
+           "Analyze Microsoft's recent performance", 'amazn earnings', 'JPM vs GS']
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return float('nan')
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def tool_calls(agent, i):
+    ticker, company = TICKERS[i % len(TICKERS)]
+    return {
+        'identify_ticker': (agent.identify_ticker, QUERIES[i % len(QUERIES)]),
+        'ticker_price': (agent.ticker_price, ticker),
+        'ticker_price_change': (agent.ticker_price_change, ticker, '1week'),
+        'ticker_analysis': (agent.ticker_analysis, ticker, company, '1month')
+    }
+
+
+def reset(agent, data_root, run):
+    """Forget everything cached so the next call is cold"""
+    agent.response_cache.clear()
+    agent.bar_store = agent.BarStore(os.path.join(data_root, f'cold-{run}'))
+    agent.indicator_engine._sets.clear()
+    agent.news_pipeline._state.clear()
+
+
+def report(title, timings, upstream):
+    print(f"\n{title}")
+    print(f"  {'tool':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, (samples, errors) in timings.items():
+        print(f"  {name:<22}{percentile(samples, 50):>10.2f}{percentile(samples, 95):>10.2f}"
+              f"{percentile(samples, 99):>10.2f}{errors:>8}")
+    print(f"  upstream calls: {sum(upstream.values())} {dict(sorted(upstream.items()))}")
+
+
+def run_phase(agent, server, runs, data_root, cold):
+    timings = {}
+    if not cold:
+        # Prime every ticker once so the measured calls are all repeats
+        for run in range(len(TICKERS)):
+            for fn, *args in tool_calls(agent, run).values():
+                fn(*args)
+    server.reset_stats()
+    for run in range(runs):
+        for name, (fn, *args) in tool_calls(agent, run).items():
+            if cold:
+                # Per tool, or ticker_analysis would find the quote and bars the calls before it fetched
+                reset(agent, data_root, f'{run}-{name}')
+            elapsed, result = timed(fn, *args)
+            samples, errors = timings.setdefault(name, ([], 0))
+            timings[name] = (samples + [elapsed], errors + (result.get('status') != 'success'))
+    return timings, dict(server.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated upstream latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.03)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--note-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', help='recorded payloads for the replay server')
+    args = parser.parse_args()
+
+    # The agent reads its configuration when it is first imported
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    url = f'http://127.0.0.1:{port}'
+    data_root = tempfile.mkdtemp(prefix='stock-bench-')
+    os.environ.update({
+        'ALPHA_VANTAGE_BASE_URL': url,
+        'NEWS_API_BASE_URL': url,
+        'ALPHA_VANTAGE_API_KEY': os.getenv('ALPHA_VANTAGE_API_KEY', 'replay'),
+        'NEWS_API_KEY': os.getenv('NEWS_API_KEY', 'replay'),
+        'ALPHA_VANTAGE_CALLS_PER_MINUTE': '100000',
+        'ALPHA_VANTAGE_CALLS_PER_DAY': '1000000',
+        'STOCK_AGENT_DATA_DIR': os.path.join(data_root, 'bars'),
+        'STOCK_AGENT_WATCHLIST': ''
+    })
+    os.environ.pop('STOCK_AGENT_CACHE_DIR', None)
+    from stock_anaylsis_agent import agent
+    from stock_anaylsis_agent.replay import ReplayServer
+    server = ReplayServer(port=port, fixtures_dir=args.fixtures, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, note_rate=args.note_rate, seed=7).start()
+
+    print(f"Replay server at {server.url}, latency {args.latency * 1000:.0f}ms +{args.jitter * 1000:.0f}ms, "
+          f"{args.runs} runs")
+    timings, upstream = run_phase(agent, server, args.runs, data_root, cold=True)
+    report('Cold (empty cache and bar store)', timings, upstream)
+    timings, upstream = run_phase(agent, server, args.runs, data_root, cold=False)
+    report('Warm', timings, upstream)
+
+    server.reset_stats()
+    reset(agent, data_root, 'throughput')
+    jobs = [(agent.ticker_analysis, t, c, '1week') for t, c in TICKERS] * max(1, args.runs // 4)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda job: job[0](*job[1:]), jobs))
+    elapsed = time.perf_counter() - start
+    failed = sum(r.get('status') != 'success' for r in results)
+    print(f"\nThroughput: {len(jobs)} ticker_analysis calls on {args.threads} threads in {elapsed:.2f}s "
+          f"({len(jobs) / elapsed:.1f}/s, {failed} failed, {sum(server.stats.values())} upstream calls)")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,9 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # Imported on first use so `python -m stock_anaylsis_agent.screen` and the data
+    # modules start without building the agent
+    if name == 'agent':
+        return importlib.import_module('.agent', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, time as dt_time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from .models import decode_value, encode_value
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+# Alpha Vantage publishes the final daily bar a little after the closing bell
+CLOSE_PUBLISH_DELAY = timedelta(minutes=20)
+
+QUOTE_TTL_OPEN = 15
+INTRADAY_TTL_OPEN = 60
+NEWS_TTL = 300
+SEARCH_TTL = 24 * 3600
+# How long past expiry a value may still be served while one refresh runs in the background
+STALE_GRACE = 120
+
+INTRADAY_FUNCTIONS = {'GLOBAL_QUOTE', 'TIME_SERIES_INTRADAY'}
+DAILY_FUNCTIONS = {'TIME_SERIES_DAILY', 'TIME_SERIES_DAILY_ADJUSTED', 'TIME_SERIES_WEEKLY', 'TIME_SERIES_MONTHLY'}
+
+
+class CacheKey(NamedTuple):
+    provider: str
+    function: str
+    symbol: Optional[str] = None
+    interval: Optional[str] = None
+    outputsize: Optional[str] = None
+
+    def digest(self) -> str:
+        raw = '|'.join('' if part is None else str(part) for part in self)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Regular US equity session, weekdays 09:30-16:00 ET (exchange holidays are not modelled)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_session_boundary(now: datetime, boundary: dt_time) -> datetime:
+    """Next weekday occurrence of a session boundary (open or close) strictly after now"""
+    now = now.astimezone(MARKET_TZ)
+    candidate = datetime.combine(now.date(), boundary, tzinfo=MARKET_TZ)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def previous_session_boundary(now: datetime, boundary: dt_time) -> datetime:
+    """Latest weekday occurrence of a session boundary at or before now"""
+    now = now.astimezone(MARKET_TZ)
+    candidate = datetime.combine(now.date(), boundary, tzinfo=MARKET_TZ)
+    if candidate > now:
+        candidate -= timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
+
+
+def last_published_session(now: Optional[datetime] = None) -> str:
+    """ISO date of the most recent session whose daily bar has been published"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ) - CLOSE_PUBLISH_DELAY
+    day = now.date() if now.time() >= MARKET_CLOSE else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def ttl_for(key: CacheKey, now: Optional[datetime] = None) -> float:
+    """Seconds a response for this key stays fresh, based on the market session"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+
+    if key.provider == 'newsapi':
+        return NEWS_TTL
+    if key.function == 'SYMBOL_SEARCH':
+        return SEARCH_TTL
+
+    if key.function in INTRADAY_FUNCTIONS:
+        if is_market_open(now):
+            return QUOTE_TTL_OPEN if key.function == 'GLOBAL_QUOTE' else INTRADAY_TTL_OPEN
+        # Nothing moves until the next open
+        return (next_session_boundary(now, MARKET_OPEN) - now).total_seconds()
+
+    if key.function in DAILY_FUNCTIONS:
+        # Daily bars only change once the next session has closed and been published
+        expires = next_session_boundary(now - CLOSE_PUBLISH_DELAY, MARKET_CLOSE) + CLOSE_PUBLISH_DELAY
+        return max((expires - now).total_seconds(), QUOTE_TTL_OPEN)
+
+    return INTRADAY_TTL_OPEN
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution whose outcome all callers share"""
+
+    def __init__(self):
+        self._calls: Dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.value = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def in_flight(self, key: Any) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class ResponseCache:
+    """Bounded LRU cache of upstream responses with an optional on-disk tier
+
+    Concurrent misses for the same key share one upstream call, and values up to
+    stale_grace seconds past expiry are served while a single background refresh runs.
+    """
+
+    def __init__(self, max_entries: int = 256, disk_dir: Optional[str] = None, stale_grace: float = STALE_GRACE):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.stale_grace = stale_grace
+        self._entries: 'OrderedDict[CacheKey, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Fresh value for key, or None"""
+        value, fresh = self._lookup(key)
+        return value if fresh else None
+
+    def _lookup(self, key: CacheKey) -> Tuple[Optional[Any], bool]:
+        """(value, is_fresh); stale values within the grace period come back with is_fresh False"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] + self.stale_grace <= now:
+                del self._entries[key]
+                entry = None
+
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is None or entry[0] + self.stale_grace <= now:
+                with self._lock:
+                    self.misses += 1
+                return None, False
+
+        with self._lock:
+            self._store(key, entry)
+            if entry[0] > now:
+                self.hits += 1
+                return entry[1], True
+            self.stale_hits += 1
+            return entry[1], False
+
+    def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl_for(key) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Any],
+                     cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Return the cached value for key, calling fetch at most once across concurrent misses"""
+        value, fresh = self._lookup(key)
+        if value is not None:
+            if not fresh and not self._flights.in_flight(key):
+                self._refresher.submit(self._refresh, key, fetch, cacheable)
+            return value
+
+        if self._flights.in_flight(key):
+            with self._lock:
+                self.coalesced += 1
+        return self._flights.do(key, lambda: self._fetch_and_store(key, fetch, cacheable))
+
+    def _fetch_and_store(self, key: CacheKey, fetch: Callable[[], Any], cacheable: Callable[[Any], bool]) -> Any:
+        value = fetch()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def _is_fresh(self, key: CacheKey) -> bool:
+        """Whether memory holds an unexpired value for key, without counting a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def _refresh(self, key: CacheKey, fetch: Callable[[], Any], cacheable: Callable[[Any], bool]) -> None:
+        # Another caller may have refreshed it while this job was queued
+        if self._is_fresh(key):
+            return
+        try:
+            self._flights.do(key, lambda: self._fetch_and_store(key, fetch, cacheable))
+        except Exception as e:
+            # The stale value was already served; the next request retries
+            print(f"Background refresh failed for {key}: {e}")
+
+    def invalidate(self, key: CacheKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+            self.coalesced = 0
+
+    def _store(self, key: CacheKey, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: CacheKey) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{key.digest()}.json")
+
+    def _read_disk(self, key: CacheKey) -> Optional[tuple]:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            return payload['expires_at'], decode_value(payload['value'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_disk(self, key: CacheKey, entry: tuple) -> None:
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': list(key), 'expires_at': entry[0], 'value': encode_value(entry[1])}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Error writing cache entry: {e}")
@@ -0,0 +1,176 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .indicators import TRADING_DAYS_PER_YEAR
+from .returns import PriceSeries, ReturnTable
+
+# Rolling statistics are sampled at no more than this many window end points
+MAX_ROLLING_POINTS = 260
+
+
+class AlignedCloses:
+    """Closes of several tickers on one shared trading-date index, oldest first
+
+    closes is sessions x tickers; a ticker that did not trade on a date carries its
+    previous close forward, and dates before its first bar are NaN.
+    """
+
+    def __init__(self, tickers: List[str], days: np.ndarray, closes: np.ndarray):
+        self.tickers = tickers
+        self.days = days
+        self.closes = closes
+
+    @classmethod
+    def align(cls, series: Dict[str, PriceSeries], start_day: int, end_day: int) -> 'AlignedCloses':
+        tickers = list(series)
+        flat_days = np.concatenate([series[t].days for t in tickers])
+        flat_closes = np.concatenate([series[t].closes for t in tickers])
+        columns = np.repeat(np.arange(len(tickers)), [len(series[t]) for t in tickers])
+        keep = (flat_days >= start_day) & (flat_days <= end_day)
+        flat_days, flat_closes, columns = flat_days[keep], flat_closes[keep], columns[keep]
+
+        days = np.unique(flat_days)
+        closes = np.full((len(days), len(tickers)), np.nan)
+        closes[np.searchsorted(days, flat_days), columns] = flat_closes
+
+        # Forward fill: each cell takes the row of the latest close at or above it
+        rows = np.where(np.isnan(closes), 0, np.arange(len(days))[:, None])
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        return cls(tickers, days, closes[rows, np.arange(len(tickers))])
+
+    def returns(self) -> np.ndarray:
+        """Session-over-session returns, (sessions - 1) x tickers, NaN before a ticker's first bar"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.closes[1:] / self.closes[:-1] - 1.0
+
+
+def pairwise_stats(returns: np.ndarray, min_periods: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Correlation and beta matrices over pairwise-complete observations
+
+    returns is (..., sessions, tickers); every pair is computed at once from matrix
+    products. beta[..., i, j] is the beta of ticker i against ticker j.
+    """
+    present = np.isfinite(returns).astype(np.float64)
+    r = np.where(present > 0, returns, 0.0)
+    r_t = np.swapaxes(r, -1, -2)
+    n = np.swapaxes(present, -1, -2) @ present
+    sum_xy = r_t @ r
+    # sum_x[i, j]: sum of i's returns on the sessions j also traded
+    sum_x = r_t @ present
+    sum_xx = (r_t * r_t) @ present
+    sum_y = np.swapaxes(sum_x, -1, -2)
+    sum_yy = np.swapaxes(sum_xx, -1, -2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x * sum_x / n
+        var_y = sum_yy - sum_y * sum_y / n
+        correlation = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_y
+    too_few = n < min_periods
+    correlation[too_few] = np.nan
+    beta[too_few] = np.nan
+    return correlation, beta
+
+
+def rolling_pairwise_stats(returns: np.ndarray, window: int,
+                           max_points: int = MAX_ROLLING_POINTS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Correlation and beta matrices over trailing windows of returns
+
+    Returns (end_rows, correlation, beta). Windows end every few sessions so that
+    there are at most max_points of them, always including the latest one.
+    """
+    sessions = returns.shape[0]
+    if sessions < window:
+        empty = np.empty((0, returns.shape[1], returns.shape[1]))
+        return np.empty(0, dtype=np.int64), empty, empty
+    step = max(1, -(-(sessions - window + 1) // max_points))
+    ends = np.arange(sessions, window - 1, -step)[::-1]
+    # windows x tickers x sessions view, then back to windows x sessions x tickers
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window, axis=0)[ends - window]
+    correlation, beta = pairwise_stats(np.swapaxes(windows, -1, -2), min_periods=max(2, window // 2))
+    return ends, correlation, beta
+
+
+def drawdowns(closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximum and current drawdown per column, as negative fractions"""
+    peaks = np.fmax.accumulate(closes, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = closes / peaks - 1.0
+    return np.nanmin(drawdown, axis=0), drawdown[-1]
+
+
+def _rounded(values: np.ndarray, digits: int) -> Any:
+    """Nested lists of rounded floats with None for NaN"""
+    if values.ndim == 0:
+        return None if np.isnan(values) else round(float(values), digits)
+    return [_rounded(v, digits) for v in values]
+
+
+def compare(aligned: AlignedCloses, benchmark: str, window: int = 60) -> Dict[str, Any]:
+    """Relative performance, drawdowns, correlation and beta for aligned tickers"""
+    closes = aligned.closes
+    tickers = aligned.tickers
+    b = tickers.index(benchmark)
+    returns = aligned.returns()
+
+    first_row = np.argmax(np.isfinite(closes), axis=0)
+    first_close = closes[first_row, np.arange(len(tickers))]
+    total = closes[-1] / first_close - 1.0
+    volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    max_drawdown, current_drawdown = drawdowns(closes)
+    correlation, beta = pairwise_stats(returns)
+    ends, rolling_correlation, rolling_beta = rolling_pairwise_stats(returns, window)
+
+    performance = []
+    for i, ticker in enumerate(tickers):
+        row = {
+            'ticker': ticker,
+            'start_date': str(np.datetime64(int(aligned.days[first_row[i]]), 'D')),
+            'start_close': float(first_close[i]),
+            'end_close': float(closes[-1, i]),
+            'total_return_pct': _rounded(total[i] * 100, 2),
+            'vs_benchmark_pct': _rounded((total[i] - total[b]) * 100, 2),
+            'annualized_volatility_pct': _rounded(volatility[i] * 100, 2),
+            'max_drawdown_pct': _rounded(max_drawdown[i] * 100, 2),
+            'current_drawdown_pct': _rounded(current_drawdown[i] * 100, 2),
+            'correlation_to_benchmark': _rounded(correlation[i, b], 3),
+            'beta_to_benchmark': _rounded(beta[i, b], 3)
+        }
+        if len(ends):
+            to_benchmark = rolling_correlation[:, i, b]
+            row['rolling_correlation'] = {
+                'latest': _rounded(to_benchmark[-1], 3),
+                'min': _rounded(np.nanmin(to_benchmark), 3) if np.isfinite(to_benchmark).any() else None,
+                'max': _rounded(np.nanmax(to_benchmark), 3) if np.isfinite(to_benchmark).any() else None
+            }
+            row['rolling_beta'] = _rounded(rolling_beta[-1, i, b], 3)
+        performance.append(row)
+    performance.sort(key=lambda row: -np.inf if row['total_return_pct'] is None else row['total_return_pct'],
+                     reverse=True)
+
+    result = {
+        'start_date': str(np.datetime64(int(aligned.days[0]), 'D')),
+        'end_date': str(np.datetime64(int(aligned.days[-1]), 'D')),
+        'sessions': len(aligned.days),
+        'benchmark': benchmark,
+        'performance': performance,
+        'correlation': {'tickers': tickers, 'matrix': _rounded(correlation, 3)}
+    }
+    if len(ends):
+        result['rolling'] = {
+            'window': window,
+            'as_of': str(np.datetime64(int(aligned.days[ends[-1]]), 'D')),
+            'correlation': _rounded(rolling_correlation[-1], 3),
+            'beta': _rounded(rolling_beta[-1], 3)
+        }
+    return result
+
+
+def period_bounds(table: ReturnTable, window: int = 0) -> Optional[Tuple[int, int]]:
+    """First and last day covering every ticker that has the history for one window of a ReturnTable"""
+    valid = ~np.isnan(table.percent[:, window])
+    if not valid.any():
+        return None
+    return int(table.start_days[valid, window].min()), int(table.end_days[valid, window].max())
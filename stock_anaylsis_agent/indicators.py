@@ -0,0 +1,225 @@
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .models import DailyBars, day_to_date
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class SMA:
+    """Simple moving average with a running window sum"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window = deque()
+        self._sum = 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._sum / self.period if len(self._window) == self.period else None
+
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first period values"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._seed = SMA(period)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is None:
+            self.value = self._seed.update(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class Wilder:
+    """Wilder's smoothing (RMA), as used by RSI and ATR"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._count = 0
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is None:
+            self._count += 1
+            self._sum += x
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+
+class RSI:
+    def __init__(self, period: int = 14):
+        self._gain = Wilder(period)
+        self._loss = Wilder(period)
+        self._prev: Optional[float] = None
+        self.value: Optional[float] = None
+
+    def update(self, close: float) -> Optional[float]:
+        if self._prev is not None:
+            delta = close - self._prev
+            gain = self._gain.update(max(delta, 0.0))
+            loss = self._loss.update(max(-delta, 0.0))
+            if gain is not None:
+                self.value = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+        self._prev = close
+        return self.value
+
+
+class RollingVolatility:
+    """Standard deviation of daily returns over a window, from running sums"""
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self._window = deque()
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._prev: Optional[float] = None
+
+    def update(self, close: float) -> Optional[float]:
+        if self._prev:
+            r = close / self._prev - 1.0
+            self._window.append(r)
+            self._sum += r
+            self._sumsq += r * r
+            if len(self._window) > self.period:
+                old = self._window.popleft()
+                self._sum -= old
+                self._sumsq -= old * old
+        self._prev = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        n = len(self._window)
+        if n < self.period:
+            return None
+        variance = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class ATR:
+    def __init__(self, period: int = 14):
+        self._rma = Wilder(period)
+        self._prev_close: Optional[float] = None
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self.value = self._rma.update(true_range)
+        self._prev_close = close
+        return self.value
+
+
+class MaxDrawdown:
+    """Deepest peak-to-trough decline seen so far, as a negative fraction"""
+
+    def __init__(self):
+        self.peak: Optional[float] = None
+        self.value = 0.0
+        self.current = 0.0
+
+    def update(self, close: float) -> float:
+        if self.peak is None or close > self.peak:
+            self.peak = close
+        self.current = close / self.peak - 1.0
+        self.value = min(self.value, self.current)
+        return self.value
+
+
+class IndicatorSet:
+    """All indicators for one ticker, each advanced in O(1) per bar"""
+
+    def __init__(self):
+        self.sma20 = SMA(20)
+        self.sma50 = SMA(50)
+        self.sma200 = SMA(200)
+        self.ema12 = EMA(12)
+        self.ema26 = EMA(26)
+        self.rsi14 = RSI(14)
+        self.volatility20 = RollingVolatility(20)
+        self.atr14 = ATR(14)
+        self.drawdown = MaxDrawdown()
+        self.last_day: Optional[int] = None
+        self.last_close: Optional[float] = None
+        self.bars = 0
+
+    def update(self, day: int, high: float, low: float, close: float) -> None:
+        for indicator in (self.sma20, self.sma50, self.sma200, self.ema12, self.ema26,
+                          self.rsi14, self.volatility20, self.drawdown):
+            indicator.update(close)
+        self.atr14.update(high, low, close)
+        self.last_day = day
+        self.last_close = close
+        self.bars += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        daily_vol = self.volatility20.value
+        macd = None
+        if self.ema12.value is not None and self.ema26.value is not None:
+            macd = self.ema12.value - self.ema26.value
+        return {
+            'as_of': day_to_date(self.last_day) if self.last_day is not None else None,
+            'close': self.last_close,
+            'sma_20': self.sma20.value,
+            'sma_50': self.sma50.value,
+            'sma_200': self.sma200.value,
+            'ema_12': self.ema12.value,
+            'ema_26': self.ema26.value,
+            'macd': macd,
+            'rsi_14': self.rsi14.value,
+            'daily_volatility_pct': daily_vol * 100 if daily_vol is not None else None,
+            'annualized_volatility_pct': daily_vol * math.sqrt(TRADING_DAYS_PER_YEAR) * 100 if daily_vol is not None else None,
+            'atr_14': self.atr14.value,
+            'max_drawdown_pct': self.drawdown.value * 100,
+            'current_drawdown_pct': self.drawdown.current * 100,
+            'bars': self.bars
+        }
+
+
+class IndicatorEngine:
+    """Per-ticker indicator state that only consumes bars it has not seen yet"""
+
+    def __init__(self):
+        self._sets: Dict[str, IndicatorSet] = {}
+        self._lock = threading.Lock()
+
+    def update(self, ticker: str, bars: DailyBars) -> IndicatorSet:
+        ticker = ticker.upper()
+        with self._lock:
+            state = self._sets.get(ticker)
+            days = bars.columns['date']
+            # The store is append-only; fewer bars than consumed means it was rebuilt
+            if state is None or len(days) < state.bars:
+                state = self._sets[ticker] = IndicatorSet()
+
+            start = 0
+            if state.last_day is not None:
+                # Bars are sorted, so everything after the last seen day is new
+                start = len(days)
+                while start > 0 and days[start - 1] > state.last_day:
+                    start -= 1
+            columns = bars.columns
+            for i in range(start, len(days)):
+                state.update(days[i], columns['high'][i], columns['low'][i], columns['close'][i])
+            return state
@@ -0,0 +1,269 @@
+import threading
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Minute timestamps are wall-clock US/Eastern, as Alpha Vantage reports them, counted from 1970-01-01 00:00
+_EPOCH = datetime(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+SESSION_OPEN_MINUTE = 9 * 60 + 30
+SESSION_CLOSE_MINUTE = 16 * 60
+SESSION_MINUTES = SESSION_CLOSE_MINUTE - SESSION_OPEN_MINUTE
+RESAMPLE_MINUTES = (5, 15, 60)
+
+# Enough for one full extended-hours day (04:00-20:00) of 1-minute bars
+DEFAULT_CAPACITY = 1024
+
+MINUTE_COLUMNS = {
+    'minute': 'q',
+    'open': 'd',
+    'high': 'd',
+    'low': 'd',
+    'close': 'd',
+    'volume': 'q'
+}
+
+MinuteBar = Tuple[int, float, float, float, float, int]
+
+
+def timestamp_to_minute(value: str) -> int:
+    return int((datetime.fromisoformat(value[:16]) - _EPOCH).total_seconds()) // 60
+
+
+def minute_to_timestamp(minute: int) -> str:
+    return (_EPOCH + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M')
+
+
+def rows_from_series(series: Dict[str, Dict[str, str]]) -> List[MinuteBar]:
+    """Alpha Vantage 'Time Series (1min)' entries as (minute, open, high, low, close, volume), oldest first"""
+    return sorted(
+        (timestamp_to_minute(stamp), float(bar['1. open']), float(bar['2. high']), float(bar['3. low']),
+         float(bar['4. close']), int(float(bar['5. volume'])))
+        for stamp, bar in series.items()
+    )
+
+
+def latest_session(rows: List[MinuteBar], limit: int) -> List[MinuteBar]:
+    """The last limit bars of the latest day in rows (oldest first)"""
+    if not rows:
+        return rows
+    day_start = rows[-1][0] - rows[-1][0] % MINUTES_PER_DAY
+    first = len(rows)
+    while first > 0 and rows[first - 1][0] >= day_start:
+        first -= 1
+    return rows[max(first, len(rows) - limit):]
+
+
+class MinuteRing:
+    """Fixed-capacity columnar ring of 1-minute bars; once full, each append overwrites the oldest bar"""
+
+    __slots__ = ('capacity', 'columns', '_start', '_size')
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.columns = {name: array(code, [0] * capacity) for name, code in MINUTE_COLUMNS.items()}
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, bar: MinuteBar) -> None:
+        if self._size < self.capacity:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        for column, value in zip(self.columns.values(), bar):
+            column[slot] = value
+
+    def _slot(self, i: int) -> int:
+        if i < 0:
+            i += self._size
+        return (self._start + i) % self.capacity
+
+    def value(self, name: str, i: int) -> Any:
+        """Column value of the i-th bar, oldest first (negative counts back from the newest)"""
+        return self.columns[name][self._slot(i)]
+
+    def locate(self, minute: int) -> int:
+        """Index of the last bar at or before minute, -1 if every bar is later"""
+        minutes = self.columns['minute']
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if minutes[self._slot(mid)] <= minute:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def nbytes(self) -> int:
+        return sum(len(column) * column.itemsize for column in self.columns.values())
+
+
+class AggregateBar:
+    """OHLCV of consecutive 1-minute bars, with the volume-weighted average of their typical prices"""
+
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'pv')
+
+    def __init__(self, start: int, open_: float, high: float, low: float, close: float, volume: int):
+        self.start = start
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.pv = (high + low + close) / 3 * volume
+
+    def add(self, high: float, low: float, close: float, volume: int) -> None:
+        self.high = max(self.high, high)
+        self.low = min(self.low, low)
+        self.close = close
+        self.volume += volume
+        self.pv += (high + low + close) / 3 * volume
+
+    @property
+    def vwap(self) -> Optional[float]:
+        return self.pv / self.volume if self.volume else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'start': minute_to_timestamp(self.start),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume,
+            'vwap': self.vwap
+        }
+
+
+class Resampler:
+    """Streams 1-minute bars into N-minute bars aligned to the 09:30 open, keeping the latest few"""
+
+    def __init__(self, minutes: int, keep: int):
+        self.minutes = minutes
+        self.completed: Deque[AggregateBar] = deque(maxlen=keep)
+        self.current: Optional[AggregateBar] = None
+
+    def update(self, minute: int, open_: float, high: float, low: float, close: float, volume: int) -> None:
+        start = minute - (minute % MINUTES_PER_DAY - SESSION_OPEN_MINUTE) % self.minutes
+        if self.current is not None and self.current.start == start:
+            self.current.add(high, low, close, volume)
+            return
+        if self.current is not None:
+            self.completed.append(self.current)
+        self.current = AggregateBar(start, open_, high, low, close, volume)
+
+    def bars(self, limit: Optional[int] = None) -> List[AggregateBar]:
+        """Newest limit bars, oldest first; the last one is still forming until its interval ends"""
+        bars = list(self.completed) + ([self.current] if self.current else [])
+        return bars[-limit:] if limit else bars
+
+
+class IntradayBuffer:
+    """One ticker's recent 1-minute bars plus running 5/15/60-minute bars and session VWAP
+
+    Each bar is consumed once, on arrival; nothing re-reads the history.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.ring = MinuteRing(capacity)
+        self.resamplers = {m: Resampler(m, max(capacity // m, 1)) for m in RESAMPLE_MINUTES}
+        self.session: Optional[AggregateBar] = None
+        self._session_day: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ring)
+
+    @property
+    def last_minute(self) -> Optional[int]:
+        return self.ring.value('minute', -1) if len(self.ring) else None
+
+    def ingest(self, rows: Iterable[MinuteBar]) -> int:
+        """Consume bars newer than the last one seen (rows oldest first); returns how many were new"""
+        with self._lock:
+            last = self.last_minute
+            new = [row for row in rows if last is None or row[0] > last]
+            # Bars beyond the ring's capacity would be overwritten before anyone read them
+            new = new[-self.ring.capacity:]
+            for row in new:
+                self._update(*row)
+            return len(new)
+
+    def _update(self, minute: int, open_: float, high: float, low: float, close: float, volume: int) -> None:
+        self.ring.append((minute, open_, high, low, close, volume))
+        for resampler in self.resamplers.values():
+            resampler.update(minute, open_, high, low, close, volume)
+
+        day, minute_of_day = divmod(minute, MINUTES_PER_DAY)
+        if not SESSION_OPEN_MINUTE <= minute_of_day < SESSION_CLOSE_MINUTE:
+            return
+        if day != self._session_day:
+            self._session_day = day
+            self.session = AggregateBar(minute, open_, high, low, close, volume)
+        else:
+            self.session.add(high, low, close, volume)
+
+    def change(self, minutes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Move from the close minutes before the latest bar, or from the regular-session open for None
+
+        Returns None when the buffer does not reach back that far.
+        """
+        with self._lock:
+            if not len(self.ring):
+                return None
+            current = self.ring.value('close', -1)
+            current_minute = self.last_minute
+            if minutes is None:
+                if self.session is None or self._session_day != current_minute // MINUTES_PER_DAY:
+                    return None
+                reference, reference_minute = self.session.open, self.session.start
+            else:
+                i = self.ring.locate(current_minute - minutes)
+                if i < 0:
+                    return None
+                reference, reference_minute = self.ring.value('close', i), self.ring.value('minute', i)
+            session_vwap = self.session.vwap if self.session is not None else None
+
+        change = current - reference
+        return {
+            'price_change': change,
+            'percent_change': change / reference * 100 if reference else 0.0,
+            'previous_close': reference,
+            'current_close': current,
+            'current_date': minute_to_timestamp(current_minute),
+            'previous_date': minute_to_timestamp(reference_minute),
+            'minutes': current_minute - reference_minute,
+            'session_vwap': session_vwap
+        }
+
+    def resampled(self, minutes: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if minutes not in self.resamplers:
+            raise ValueError(f"Unsupported interval: {minutes}min. Supported: "
+                             f"{', '.join(f'{m}min' for m in RESAMPLE_MINUTES)}")
+        with self._lock:
+            return [bar.to_dict() for bar in self.resamplers[minutes].bars(limit)]
+
+
+class IntradayStore:
+    """In-memory IntradayBuffer per ticker; memory per ticker is fixed by the ring capacity"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buffers: Dict[str, IntradayBuffer] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str) -> IntradayBuffer:
+        with self._lock:
+            buffer = self._buffers.get(ticker.upper())
+            if buffer is None:
+                buffer = self._buffers[ticker.upper()] = IntradayBuffer(self.capacity)
+            return buffer
+
+    def ingest(self, ticker: str, rows: Iterable[MinuteBar]) -> int:
+        return self.get(ticker).ingest(rows)
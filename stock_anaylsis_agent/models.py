@@ -0,0 +1,225 @@
+import base64
+import json
+import re
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+# Column name -> array typecode; 44 bytes per bar instead of a dict of strings per day
+COLUMNS = {
+    'date': 'i',     # days since 1970-01-01
+    'open': 'd',
+    'high': 'd',
+    'low': 'd',
+    'close': 'd',
+    'volume': 'q'
+}
+
+# One daily/weekly/monthly bar in the Alpha Vantage layout; intraday keys carry a time and do not match
+_BAR_RE = re.compile(
+    rb'"(\d{4}-\d{2}-\d{2})"\s*:\s*\{\s*'
+    rb'"1\. open"\s*:\s*"([^"]*)"\s*,\s*'
+    rb'"2\. high"\s*:\s*"([^"]*)"\s*,\s*'
+    rb'"3\. low"\s*:\s*"([^"]*)"\s*,\s*'
+    rb'"4\. close"\s*:\s*"([^"]*)"\s*,\s*'
+    rb'"5\. volume"\s*:\s*"([^"]*)"\s*\}'
+)
+
+
+def date_to_day(value: str) -> int:
+    return date.fromisoformat(value[:10]).toordinal() - _EPOCH_ORDINAL
+
+
+def day_to_date(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).isoformat()
+
+
+class DailyBars:
+    """Columnar OHLCV series, oldest bar first"""
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: Optional[Dict[str, array]] = None):
+        self.columns = columns or {name: array(code) for name, code in COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return len(self.columns['date'])
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return day_to_date(self.columns['date'][-1]) if len(self) else None
+
+    @property
+    def first_date(self) -> Optional[str]:
+        return day_to_date(self.columns['date'][0]) if len(self) else None
+
+    def after(self, day: Optional[int]) -> 'DailyBars':
+        """Bars dated strictly after day (all of them for None)"""
+        if day is None:
+            return self
+        start = bisect_right(self.columns['date'], day)
+        return DailyBars({name: column[start:] for name, column in self.columns.items()})
+
+    def through(self, day: int) -> 'DailyBars':
+        """Bars dated on or before day"""
+        end = bisect_right(self.columns['date'], day)
+        if end == len(self):
+            return self
+        return DailyBars({name: column[:end] for name, column in self.columns.items()})
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {name: base64.b64encode(column.tobytes()).decode('ascii') for name, column in self.columns.items()}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, str]) -> 'DailyBars':
+        columns = {}
+        for name, code in COLUMNS.items():
+            column = array(code)
+            column.frombytes(base64.b64decode(payload[name]))
+            columns[name] = column
+        return cls(columns)
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    """Latest trade summary for one ticker, already converted to numbers"""
+    ticker: str
+    price: float
+    change: float = 0.0
+    change_percent: float = 0.0
+    volume: int = 0
+    latest_trading_day: str = ''
+    previous_close: float = 0.0
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    fetched_at: float = field(default_factory=time.time, compare=False)
+
+    @classmethod
+    def from_global_quote(cls, raw: Dict[str, str]) -> 'Quote':
+        return cls(
+            ticker=raw['01. symbol'],
+            price=float(raw['05. price']),
+            change=float(raw.get('09. change') or 0),
+            change_percent=float((raw.get('10. change percent') or '0').rstrip('%')),
+            volume=int(float(raw.get('06. volume') or 0)),
+            latest_trading_day=raw.get('07. latest trading day', ''),
+            previous_close=float(raw.get('08. previous close') or 0),
+            open=float(raw['02. open']) if raw.get('02. open') else None,
+            high=float(raw['03. high']) if raw.get('03. high') else None,
+            low=float(raw['04. low']) if raw.get('04. low') else None
+        )
+
+    @classmethod
+    def from_bars(cls, ticker: str, bars: DailyBars) -> 'Quote':
+        """Quote for the latest bar, with the change against the bar before it"""
+        c = bars.columns
+        close = c['close'][-1]
+        previous = c['close'][-2] if len(bars) > 1 else close
+        return cls(
+            ticker=ticker,
+            price=close,
+            change=close - previous,
+            change_percent=(close / previous - 1) * 100 if previous else 0.0,
+            volume=c['volume'][-1],
+            latest_trading_day=bars.last_date,
+            previous_close=previous,
+            open=c['open'][-1],
+            high=c['high'][-1],
+            low=c['low'][-1]
+        )
+
+    def to_dict(self, source: Optional[str] = None) -> Dict[str, Any]:
+        """The ticker_price response shape"""
+        result = {
+            'status': 'success',
+            'ticker': self.ticker,
+            'current_price': self.price,
+            'change': self.change,
+            'change_percent': f"{self.change_percent:.4f}",
+            'volume': self.volume,
+            'latest_trading_day': self.latest_trading_day,
+            'previous_close': self.previous_close,
+            'as_of': datetime.fromtimestamp(self.fetched_at, timezone.utc).isoformat(timespec='seconds'),
+            'age_seconds': round(max(time.time() - self.fetched_at, 0.0), 1)
+        }
+        for name in ('open', 'high', 'low'):
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        if source:
+            result['source'] = source
+        return result
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
+
+
+def decode_bars(raw: bytes) -> Any:
+    """Alpha Vantage daily/weekly/monthly JSON straight to columns in one regex pass over the bytes
+
+    Payloads the regex does not fully cover (reordered or extra fields) are decoded as
+    JSON instead; error, throttle and unrecognised payloads come back as the decoded dict.
+    """
+    rows = _BAR_RE.findall(raw)
+    if not rows or len(rows) != raw.count(b'"1. open"'):
+        data = json.loads(raw)
+        series = next((value for key, value in data.items() if 'Time Series' in key), None) \
+            if isinstance(data, dict) else None
+        if not series:
+            return data
+        rows = [(day, bar['1. open'], bar['2. high'], bar['3. low'], bar['4. close'], bar['5. volume'])
+                for day, bar in series.items()]
+    # Newest first on the wire; ISO dates sort as text
+    rows.sort()
+    days, opens, highs, lows, closes, volumes = zip(*rows)
+    return DailyBars({
+        'date': array('i', [date_to_day(d if isinstance(d, str) else d.decode('ascii')) for d in days]),
+        'open': array('d', map(float, opens)),
+        'high': array('d', map(float, highs)),
+        'low': array('d', map(float, lows)),
+        'close': array('d', map(float, closes)),
+        'volume': array('q', [int(v) if v.isdigit() else int(float(v)) for v in volumes])
+    })
+
+
+def decode_quote(raw: bytes) -> Any:
+    """GLOBAL_QUOTE JSON to a Quote; payloads without a price come back as the decoded dict"""
+    data = json.loads(raw)
+    quote = data.get('Global Quote') if isinstance(data, dict) else None
+    if quote and quote.get('05. price'):
+        return Quote.from_global_quote(quote)
+    return data
+
+
+# Alpha Vantage functions with a typed decoding; everything else stays plain JSON
+DECODERS = {
+    'GLOBAL_QUOTE': decode_quote,
+    'TIME_SERIES_DAILY': decode_bars,
+    'TIME_SERIES_WEEKLY': decode_bars,
+    'TIME_SERIES_MONTHLY': decode_bars
+}
+
+_MODELS = {'DailyBars': DailyBars, 'Quote': Quote}
+
+
+def encode_value(value: Any) -> Any:
+    """JSON-safe form of a cached value, tagging model objects so decode_value can rebuild them"""
+    if isinstance(value, (DailyBars, Quote)):
+        return {'__model__': type(value).__name__, 'payload': value.to_payload()}
+    return value
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and '__model__' in value:
+        model = _MODELS[value['__model__']]
+        if model is Quote:
+            return Quote(**value['payload'])
+        return model.from_payload(value['payload'])
+    return value
@@ -0,0 +1,176 @@
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Headline keywords that tend to move a stock, weighted by how strongly they do
+KEYWORD_WEIGHTS = {
+    'earnings': 3, 'guidance': 3, 'upgrade': 3, 'downgrade': 3, 'acquisition': 3, 'acquire': 3,
+    'merger': 3, 'fda': 3, 'bankruptcy': 3,
+    'revenue': 2, 'profit': 2, 'loss': 2, 'beat': 2, 'miss': 2, 'partnership': 2, 'lawsuit': 2,
+    'approval': 2, 'forecast': 2, 'outlook': 2, 'recall': 2, 'layoff': 2, 'investigation': 2,
+    'buyback': 2, 'dividend': 2, 'deliveries': 2, 'sales': 1,
+    'analyst': 1, 'target': 1, 'deal': 1, 'regulation': 1, 'regulator': 1, 'sec': 1, 'ipo': 1
+}
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+# Hamming distance between 64-bit SimHashes below which two headlines are the same story
+DUPLICATE_DISTANCE = 3
+
+_KEYWORD_RE = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, KEYWORD_WEIGHTS), key=len, reverse=True)) + r')(?:s|es|ed|ing)?\b',
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def score_text(text: str) -> Dict[str, int]:
+    """Weighted keyword hits in text from one pass of the compiled matcher"""
+    hits = {}
+    for match in _KEYWORD_RE.finditer(text or ''):
+        keyword = match.group(1).lower()
+        hits[keyword] = KEYWORD_WEIGHTS[keyword]
+    return hits
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word bigrams"""
+    words = _WORD_RE.findall((text or '').lower())
+    shingles = [' '.join(pair) for pair in zip(words, words[1:])] or words
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@dataclass(slots=True)
+class Article:
+    title: str
+    description: str
+    url: str
+    published_at: str
+    source: str
+    relevance: float = 0.0
+    keywords: List[str] = field(default_factory=list)
+    fingerprint: int = 0
+    duplicates: int = 0
+
+    @classmethod
+    def from_newsapi(cls, raw: Dict[str, Any], names: List[str]) -> 'Article':
+        title = raw.get('title') or ''
+        description = raw.get('description') or ''
+        title_hits = score_text(title)
+        description_hits = score_text(description)
+        relevance = TITLE_WEIGHT * sum(title_hits.values()) + DESCRIPTION_WEIGHT * sum(description_hits.values())
+        # Stories that name the company in the headline are about it, not merely mentioning it
+        if relevance and any(name and re.search(rf'\b{re.escape(name)}\b', title, re.IGNORECASE) for name in names):
+            relevance *= 1.5
+        return cls(
+            title=title,
+            description=description,
+            url=raw.get('url', ''),
+            published_at=raw.get('publishedAt', ''),
+            source=(raw.get('source') or {}).get('name', 'Unknown'),
+            relevance=relevance,
+            keywords=sorted(set(title_hits) | set(description_hits)),
+            fingerprint=simhash(title)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'title': self.title,
+            'description': self.description[:200] + '...' if len(self.description) > 200 else self.description,
+            'url': self.url,
+            'published_at': self.published_at,
+            'source': self.source,
+            'relevance': self.relevance,
+            'keywords': self.keywords,
+            'duplicates': self.duplicates
+        }
+
+
+class _TickerNews:
+    __slots__ = ('articles', 'last_published_at', 'fetched_at')
+
+    def __init__(self):
+        self.articles: List[Article] = []
+        self.last_published_at: Optional[str] = None
+        self.fetched_at: Optional[float] = None
+
+
+class NewsPipeline:
+    """Per-ticker article cache that only requests articles newer than the last one seen
+
+    fetch_page(query, from_timestamp, page_size) returns a NewsAPI 'everything' payload.
+    """
+
+    def __init__(self, fetch_page: Callable[[str, Optional[str], int], Dict[str, Any]], page_size: int = 50,
+                 refresh_interval: float = 300, max_age_days: int = 7, max_articles: int = 100):
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.refresh_interval = refresh_interval
+        self.max_age = timedelta(days=max_age_days)
+        self.max_articles = max_articles
+        self._state: Dict[str, _TickerNews] = {}
+        self._lock = threading.Lock()
+
+    def articles(self, ticker: str, company_name: str) -> List[Article]:
+        """Deduplicated articles for ticker, newest first"""
+        ticker = ticker.upper()
+        with self._lock:
+            state = self._state.setdefault(ticker, _TickerNews())
+            if state.fetched_at is not None and time.monotonic() - state.fetched_at < self.refresh_interval:
+                return list(state.articles)
+            since = state.last_published_at
+
+        try:
+            data = self.fetch_page(f'"{company_name}" OR "{ticker}"', since, self.page_size)
+            if data.get('status') != 'ok':
+                raise ValueError(data.get('message', 'NewsAPI request failed'))
+        except Exception:
+            if state.articles:
+                return list(state.articles)
+            raise
+
+        names = [ticker, company_name]
+        fresh = [Article.from_newsapi(raw, names) for raw in data.get('articles', [])
+                 if raw.get('title') and raw.get('description')]
+        with self._lock:
+            self._merge(state, fresh)
+            state.fetched_at = time.monotonic()
+            return list(state.articles)
+
+    def _merge(self, state: _TickerNews, fresh: List[Article]) -> None:
+        known_urls = {article.url for article in state.articles}
+        kept = list(state.articles)
+        for article in sorted(fresh, key=lambda a: a.published_at, reverse=True):
+            if article.url in known_urls:
+                continue
+            original = next((k for k in kept if hamming(k.fingerprint, article.fingerprint) <= DUPLICATE_DISTANCE), None)
+            if original is not None:
+                original.duplicates += 1
+                continue
+            kept.append(article)
+            known_urls.add(article.url)
+
+        cutoff = (datetime.now(timezone.utc) - self.max_age).strftime('%Y-%m-%dT%H:%M:%SZ')
+        kept = [a for a in kept if not a.published_at or a.published_at >= cutoff]
+        kept.sort(key=lambda a: a.published_at, reverse=True)
+        state.articles = kept[:self.max_articles]
+        if state.articles and state.articles[0].published_at:
+            state.last_published_at = max(state.last_published_at or '', state.articles[0].published_at)
+
+    def ranked(self, ticker: str, company_name: str, limit: int = 10) -> List[Article]:
+        """Articles by relevance, then recency; syndicated stories get a small boost per extra outlet"""
+        articles = self.articles(ticker, company_name)
+        articles.sort(key=lambda a: (a.relevance * (1 + 0.1 * min(a.duplicates, 5)), a.published_at), reverse=True)
+        return articles[:limit]
@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .cache import (CLOSE_PUBLISH_DELAY, MARKET_CLOSE, MARKET_OPEN, MARKET_TZ, is_market_open, last_published_session,
+                    next_session_boundary, previous_session_boundary)
+from .returns import parse_window
+from .scheduler import MAX_REQUEUE_WAIT, RequestScheduler
+
+DEFAULT_TIMEFRAMES = ('1day', '1week', '1month', '3m', '1y', 'ytd')
+# After a run that left gaps (throttled, or the day's bar not yet published), try again this much later
+RETRY_INTERVAL = 30 * 60
+MAX_RETRIES = 3
+
+
+def _timeframe_key(timeframe: str) -> str:
+    """'1w', 'week' and '1week' all name the weekly window; unparseable specs key as written"""
+    try:
+        return parse_window(timeframe).label
+    except ValueError:
+        return timeframe.strip().lower()
+
+
+class _Entry:
+    __slots__ = ('session', 'computed_at', 'result')
+
+    def __init__(self, session: str, computed_at: float, result: Dict[str, Any]):
+        self.session = session
+        self.computed_at = computed_at
+        self.result = result
+
+
+class AnalysisPrecomputer:
+    """Background thread that precomputes analyses for popular tickers after each close
+
+    analyze(ticker, company_name, timeframe) returns a ticker_analysis result,
+    company_name(ticker) the name to analyze it under and data_session(ticker) the date
+    of the latest daily bar it was computed from. A result
+    is served only while the market is closed, was computed after the last close and
+    was built on the latest published session, so a new session invalidates it by itself.
+    With pre_open, everything is recomputed shortly before the open to pick up overnight news.
+    """
+
+    def __init__(self, analyze: Callable[[str, str, str], Dict[str, Any]], company_name: Callable[[str], str],
+                 data_session: Callable[[str], Optional[str]], tickers: Iterable[str], timeframes: Iterable[str] = DEFAULT_TIMEFRAMES,
+                 pre_open: bool = False, pre_open_lead: timedelta = timedelta(minutes=30),
+                 workers: int = 2, max_wait: float = MAX_REQUEUE_WAIT):
+        self.analyze = analyze
+        self.company_name = company_name
+        self.data_session = data_session
+        self.tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        # One spec per window, so '1w' and '1week' are not computed twice
+        self.timeframes = list({_timeframe_key(tf): tf.strip().lower() for tf in timeframes if tf.strip()}.values())
+        self.pre_open = pre_open
+        self.pre_open_lead = pre_open_lead
+        self.workers = workers
+        self.max_wait = max_wait
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None and self.tickers and self.timeframes:
+            self._thread = threading.Thread(target=self._run, name='analysis-precompute', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _valid(self, entry: Optional[_Entry], now: datetime) -> bool:
+        return (entry is not None and not is_market_open(now)
+                and entry.computed_at >= previous_session_boundary(now, MARKET_CLOSE).timestamp()
+                and entry.session == last_published_session(now))
+
+    def lookup(self, ticker: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """The precomputed analysis if it is still current, else None"""
+        entry = self._entries.get((ticker.upper(), _timeframe_key(timeframe)))
+        return entry.result if self._valid(entry, datetime.now(MARKET_TZ)) else None
+
+    def missing(self) -> List[Tuple[str, str]]:
+        now = datetime.now(MARKET_TZ)
+        return [(t, tf) for t in self.tickers for tf in self.timeframes if not self._valid(self._entries.get((t, _timeframe_key(tf))), now)]
+
+    def run_once(self, force: bool = True) -> Dict[str, Any]:
+        """Compute every (ticker, timeframe), or only those without a current result"""
+        started = time.monotonic()
+        jobs = [(t, tf) for t in self.tickers for tf in self.timeframes] if force else self.missing()
+        # Daily quota gone: leave it to the retry pass rather than holding a worker for hours
+        scheduler = RequestScheduler(self.analyze, workers=self.workers, max_requeue_wait=self.max_wait)
+        computed, failed = 0, {}
+        try:
+            # Ticker-major order: the first timeframe syncs the bars, the rest read them locally
+            for priority, (ticker, timeframe) in enumerate(jobs):
+                scheduler.submit((ticker, timeframe), ticker, self.company_name(ticker), timeframe, priority=priority)
+            for (ticker, timeframe), result in scheduler.results():
+                if result.get('status') != 'success':
+                    failed[f"{ticker}:{timeframe}"] = result.get('error_message')
+                    continue
+                entry = _Entry(self.data_session(ticker) or '', time.time(), result)
+                with self._lock:
+                    self._entries[(ticker, _timeframe_key(timeframe))] = entry
+                computed += 1
+        finally:
+            scheduler.close()
+        self.last_run = {
+            'session': last_published_session(),
+            'computed': computed,
+            'failed': failed,
+            'seconds': round(time.monotonic() - started, 2),
+            'finished_at': datetime.now(MARKET_TZ).isoformat(timespec='seconds')
+        }
+        return self.last_run
+
+    def next_run_at(self, now: datetime) -> datetime:
+        """The next post-close run, or the pre-open refresh if that comes first"""
+        runs = [next_session_boundary(now - CLOSE_PUBLISH_DELAY, MARKET_CLOSE) + CLOSE_PUBLISH_DELAY]
+        if self.pre_open:
+            runs.append(next_session_boundary(now + self.pre_open_lead, MARKET_OPEN) - self.pre_open_lead)
+        return min(runs)
+
+    def _run(self) -> None:
+        # Catch up straight away after a restart outside market hours
+        force, retries = False, 0
+        due = datetime.now(MARKET_TZ)
+        while not self._stop.is_set():
+            now = datetime.now(MARKET_TZ)
+            if now >= due:
+                if not is_market_open(now):
+                    try:
+                        self.run_once(force=force)
+                    except Exception as e:
+                        print(f"Analysis precompute failed: {e}")
+                now = datetime.now(MARKET_TZ)
+                retries = 0 if force else retries + 1
+                due, force = self.next_run_at(now), True
+                # Exchange holidays never get a bar, so retries are capped per scheduled run
+                if retries < MAX_RETRIES and self.missing() and not is_market_open(now):
+                    retry = now + timedelta(seconds=RETRY_INTERVAL)
+                    if retry < due:
+                        due, force = retry, False
+            self._stop.wait(min(max((due - now).total_seconds(), 1.0), 3600))
+
+    def status(self) -> Dict[str, Any]:
+        now = datetime.now(MARKET_TZ)
+        with self._lock:
+            current = sum(self._valid(entry, now) for entry in self._entries.values())
+        return {
+            'tickers': len(self.tickers),
+            'timeframes': self.timeframes,
+            'current': current,
+            'next_run': self.next_run_at(now).isoformat(timespec='minutes'),
+            'last_run': self.last_run
+        }
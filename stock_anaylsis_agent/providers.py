@@ -0,0 +1,374 @@
+import contextvars
+import csv
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .cache import MARKET_TZ
+from .models import COLUMNS, DailyBars, Quote, date_to_day
+from .scheduler import QuotaLimiter, RateLimitedError
+
+# Calendar days of history a 'compact' request asks providers without a compact mode for
+COMPACT_DAYS = 150
+FULL_DAYS = 365 * 20
+
+
+class ProviderError(Exception):
+    """Raised when no provider could answer a request"""
+
+
+class CircuitBreaker:
+    """Stops calls to a provider after repeated failures, then lets one probe through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold and not self.opened_until:
+            return 'closed'
+        return 'half_open' if time.monotonic() >= self.opened_until else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        return max(self.opened_until - time.monotonic(), 0.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_until = 0.0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_until = time.monotonic() + self.reset_timeout
+            self._probing = False
+
+    def trip(self, seconds: float) -> None:
+        """Open immediately, e.g. when the provider says to come back after seconds"""
+        with self._lock:
+            self.failures = max(self.failures, self.failure_threshold)
+            self.opened_until = time.monotonic() + seconds
+            self._probing = False
+
+
+class LatencyStats:
+    """EWMA and a window of recent successful call latencies, in seconds"""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._recent.append(seconds)
+            self.ewma = seconds if self.ewma is None else self.ewma + self.alpha * (seconds - self.ewma)
+
+    def penalize(self, seconds: float) -> None:
+        """Push the EWMA up after a failure without polluting the latency window"""
+        with self._lock:
+            self.ewma = seconds if self.ewma is None else self.ewma + self.alpha * (seconds - self.ewma)
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class Provider:
+    """A source of quotes and daily bars
+
+    quote() returns None and daily_bars() an empty DailyBars for tickers the
+    provider does not know; failures raise. Fallback-only providers (local files)
+    are used only when every live provider has failed.
+    """
+
+    name = 'provider'
+    fallback_only = False
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyStats()
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        raise NotImplementedError
+
+    def daily_bars(self, ticker: str, outputsize: str = 'compact') -> DailyBars:
+        raise NotImplementedError
+
+
+class AlphaVantageProvider(Provider):
+    """Alpha Vantage through request(function, symbol, outputsize=..., timeout=...), which owns quota and throttling"""
+
+    name = 'alpha_vantage'
+
+    def __init__(self, request: Callable[..., Any]):
+        super().__init__()
+        self.request = request
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        data = self.request('GLOBAL_QUOTE', ticker)
+        return data if isinstance(data, Quote) else None
+
+    def daily_bars(self, ticker: str, outputsize: str = 'compact') -> DailyBars:
+        data = self.request('TIME_SERIES_DAILY', ticker, outputsize=outputsize, timeout=30)
+        return data if isinstance(data, DailyBars) else DailyBars()
+
+
+class FinnhubProvider(Provider):
+    """Finnhub REST API; its JSON already comes as parallel arrays, which map straight onto columns"""
+
+    name = 'finnhub'
+
+    def __init__(self, transport, api_key: str, base_url: str = 'https://finnhub.io',
+                 quota: Optional[QuotaLimiter] = None, telemetry=None):
+        super().__init__()
+        self.transport = transport
+        self.api_key = api_key
+        self.url = base_url.rstrip('/') + '/api/v1'
+        # Free tier: 60 calls per minute, no daily cap
+        self.quota = quota or QuotaLimiter(per_minute=60, per_day=None)
+        self.telemetry = telemetry
+
+    def _get(self, function: str, path: str, params: Dict[str, Any], timeout: float = 10) -> Any:
+        params = dict(params, token=self.api_key)
+        request = lambda: self.transport.get(f"{self.url}/{path}", params, timeout=timeout,
+                                             before_attempt=lambda left: self.quota.acquire(timeout=left),
+                                             budget=timeout)
+        if self.telemetry is not None:
+            return self.telemetry.upstream(self.name, function, request)
+        return request().json()
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        data = self._get('quote', 'quote', {'symbol': ticker})
+        if not data or not data.get('c'):
+            return None
+        traded = datetime.fromtimestamp(data['t'], MARKET_TZ).date().isoformat() if data.get('t') else ''
+        return Quote(
+            ticker=ticker,
+            price=float(data['c']),
+            change=float(data.get('d') or 0),
+            change_percent=float(data.get('dp') or 0),
+            latest_trading_day=traded,
+            previous_close=float(data.get('pc') or 0),
+            open=data.get('o'),
+            high=data.get('h'),
+            low=data.get('l')
+        )
+
+    def daily_bars(self, ticker: str, outputsize: str = 'compact') -> DailyBars:
+        now = int(time.time())
+        days = FULL_DAYS if outputsize == 'full' else COMPACT_DAYS
+        data = self._get('candle', 'stock/candle', {
+            'symbol': ticker, 'resolution': 'D', 'from': now - days * 86400, 'to': now
+        }, timeout=30)
+        if data.get('s') != 'ok' or not data.get('t'):
+            return DailyBars()
+        return DailyBars({
+            'date': array('i', (t // 86400 for t in data['t'])),
+            'open': array('d', data['o']),
+            'high': array('d', data['h']),
+            'low': array('d', data['l']),
+            'close': array('d', data['c']),
+            'volume': array('q', (int(v) for v in data['v']))
+        })
+
+
+class CsvProvider(Provider):
+    """Daily bars from {TICKER}.csv files (date,open,high,low,close,volume; Yahoo-style headers work)"""
+
+    name = 'csv'
+    fallback_only = True
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self._loaded: Dict[str, tuple] = {}
+
+    def daily_bars(self, ticker: str, outputsize: str = 'compact') -> DailyBars:
+        path = os.path.join(self.directory, f"{ticker.upper()}.csv")
+        if not os.path.exists(path):
+            return DailyBars()
+        mtime = os.path.getmtime(path)
+        cached = self._loaded.get(ticker)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        rows = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip().lower(): v for k, v in row.items() if k}
+                try:
+                    rows.append((date_to_day(row['date']), float(row['open']), float(row['high']),
+                                 float(row['low']), float(row['close']), int(float(row.get('volume') or 0))))
+                except (KeyError, ValueError):
+                    continue
+        rows.sort()
+        bars = DailyBars({name: array(code, (r[i] for r in rows)) for i, (name, code) in enumerate(COLUMNS.items())})
+        self._loaded[ticker] = (mtime, bars)
+        return bars
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        bars = self.daily_bars(ticker)
+        return Quote.from_bars(ticker.upper(), bars) if len(bars) else None
+
+
+class ProviderRouter:
+    """Sends each request to the fastest healthy provider, hedging to the next one when it runs slow
+
+    The first provider gets until its own p95 latency (at least hedge_floor); after
+    that the request also goes to the next provider and the first good answer wins.
+    Providers whose breaker is open are skipped until it half-opens; when no provider
+    that was asked has an answer, that raises RateLimitedError until the earliest one does.
+    """
+
+    def __init__(self, providers: List[Provider], telemetry=None, hedge_floor: float = 0.05,
+                 hedge_default: float = 1.0, min_samples: int = 20, workers: int = 8):
+        self.providers = providers
+        self.telemetry = telemetry
+        self.hedge_floor = hedge_floor
+        self.hedge_default = hedge_default
+        self.min_samples = min_samples
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='provider')
+
+    def quote(self, ticker: str) -> Optional[Quote]:
+        return self.call('quote', ticker)
+
+    def daily_bars(self, ticker: str, outputsize: str = 'compact') -> DailyBars:
+        bars = self.call('daily_bars', ticker, outputsize)
+        return bars if bars is not None else DailyBars()
+
+    def ranked(self) -> List[Provider]:
+        """Healthy live providers by expected latency, then the fallbacks"""
+        live = [p for p in self.providers if not p.fallback_only and p.breaker.state != 'open']
+        # Providers without samples keep their configured order behind measured ones that are faster
+        live.sort(key=lambda p: p.latency.ewma if p.latency.ewma is not None else self.hedge_default)
+        return live + [p for p in self.providers if p.fallback_only and p.breaker.state != 'open']
+
+    def hedge_delay(self, provider: Provider) -> float:
+        if provider.latency.samples < self.min_samples:
+            return self.hedge_default
+        return max(provider.latency.percentile(95), self.hedge_floor)
+
+    def call(self, method: str, *args) -> Any:
+        queue = self.ranked()
+        skipped = [p for p in self.providers if p not in queue]
+        pending = {}
+        errors = []
+        hedged = False
+
+        def launch() -> bool:
+            while queue:
+                provider = queue.pop(0)
+                if provider.breaker.allow():
+                    future = self._pool.submit(contextvars.copy_context().run, self._invoke, provider, method, args)
+                    pending[future] = provider
+                    return True
+                skipped.append(provider)
+            return False
+
+        launch()
+        while pending:
+            timeout = None
+            if not hedged and len(pending) == 1 and queue and not next(iter(pending.values())).fallback_only:
+                timeout = self.hedge_delay(next(iter(pending.values())))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                slow = next(iter(pending.values()))
+                if launch() and self.telemetry is not None:
+                    self.telemetry.inc('provider_hedged_total', help='Requests hedged to a second provider',
+                                       provider=slow.name, method=method)
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except NotImplementedError:
+                    continue
+                except Exception as e:
+                    errors.append((provider.name, e))
+                    continue
+                if result is not None and not (isinstance(result, DailyBars) and not len(result)):
+                    return result
+            if not pending:
+                launch()
+
+        if not errors:
+            if skipped:
+                # A provider that was never asked cannot say the ticker does not exist
+                raise RateLimitedError(f"Circuit open for {', '.join(p.name for p in skipped)}",
+                                       retry_after=max(min(p.breaker.retry_after for p in skipped), 1.0))
+            return None
+        throttled = [e for _, e in errors if isinstance(e, RateLimitedError)]
+        if len(throttled) == len(errors):
+            raise RateLimitedError(str(throttled[0]), retry_after=min(e.retry_after for e in throttled))
+        raise ProviderError('; '.join(f"{name}: {e}" for name, e in errors))
+
+    def _invoke(self, provider: Provider, method: str, args: tuple) -> Any:
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = getattr(provider, method)(*args)
+            provider.latency.record(time.perf_counter() - started)
+            provider.breaker.record_success()
+            outcome = 'success' if result is not None else 'not_found'
+            return result
+        except NotImplementedError:
+            outcome = 'unsupported'
+            raise
+        except RateLimitedError as e:
+            outcome = 'throttled'
+            # Only the provider saying so opens the breaker; our own quota running out is not its fault
+            if e.upstream:
+                provider.breaker.trip(e.retry_after)
+            raise
+        except Exception:
+            # A failed call costs at least a hedge delay, so flaky providers sink in the ranking
+            provider.latency.penalize(max(time.perf_counter() - started, self.hedge_default))
+            provider.breaker.record_failure()
+            raise
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.inc('provider_calls_total', help='Market data provider calls by outcome',
+                                   provider=provider.name, method=method, outcome=outcome)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [{
+            'provider': p.name,
+            'breaker': p.breaker.state,
+            'latency_ewma_ms': p.latency.ewma * 1000 if p.latency.ewma is not None else None,
+            'latency_p95_ms': (p.latency.percentile(95) or 0) * 1000 if p.latency.samples else None,
+            'fallback_only': p.fallback_only
+        } for p in self.providers]
@@ -0,0 +1,361 @@
+"""Local stand-in for the Alpha Vantage, Finnhub and NewsAPI endpoints
+
+Serves recorded payloads from a fixtures directory, synthesising deterministic
+ones when no recording exists, with configurable latency, errors and rate-limit
+notes. Point the agent at it with ALPHA_VANTAGE_BASE_URL / FINNHUB_BASE_URL / NEWS_API_BASE_URL:
+
+    python -m stock_anaylsis_agent.replay --port 8765 --latency 0.08 --note-rate 0.05
+    ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8765 NEWS_API_BASE_URL=http://127.0.0.1:8765 adk web
+
+With --record and real API keys in the environment, misses are fetched from the
+real services and saved as fixtures for later offline runs.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .cache import last_published_session
+from .symbols import DEFAULT_LISTINGS_PATH, read_listings
+
+UPSTREAMS = {
+    'alpha_vantage': 'https://www.alphavantage.co/query',
+    'newsapi': 'https://newsapi.org/v2/everything',
+    'finnhub': 'https://finnhub.io/api/v1/'
+}
+FINNHUB_ROUTES = {'/api/v1/quote': 'quote', '/api/v1/stock/candle': 'stock/candle'}
+RATE_LIMIT_NOTE = ('Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute '
+                   'and 500 calls per day.')
+
+
+def _rng(*parts: str) -> random.Random:
+    return random.Random(zlib.crc32('|'.join(parts).encode('utf-8')))
+
+
+def _sessions(count: int) -> List[date]:
+    """The last count weekdays up to the latest published session, oldest first"""
+    day = date.fromisoformat(last_published_session())
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def synthetic_daily(symbol: str, count: int) -> Dict[str, Dict[str, str]]:
+    """Deterministic random-walk daily bars for symbol; a longer history shares the same recent bars"""
+    rng = _rng(symbol, 'daily')
+    price = 20 + rng.random() * 400
+    full = _sessions(max(count, 1000))
+    bars = {}
+    for day in full:
+        open_ = price
+        price *= 1 + rng.gauss(0.0004, 0.018)
+        high = max(open_, price) * (1 + abs(rng.gauss(0, 0.006)))
+        low = min(open_, price) * (1 - abs(rng.gauss(0, 0.006)))
+        bars[day.isoformat()] = {
+            '1. open': f"{open_:.4f}",
+            '2. high': f"{high:.4f}",
+            '3. low': f"{low:.4f}",
+            '4. close': f"{price:.4f}",
+            '5. volume': str(int(1e6 + rng.random() * 5e7))
+        }
+    keys = sorted(bars)[-count:]
+    return {k: bars[k] for k in reversed(keys)}
+
+
+def synthetic_intraday(symbol: str, interval: str) -> Dict[str, Dict[str, str]]:
+    minutes = int(re.match(r'(\d+)', interval).group(1))
+    rng = _rng(symbol, 'intraday', interval)
+    daily = synthetic_daily(symbol, 1)
+    day, bar = next(iter(daily.items()))
+    price = float(bar['1. open'])
+    stamp = datetime.fromisoformat(f"{day}T09:30:00")
+    bars = {}
+    while stamp.time() < datetime.fromisoformat(f"{day}T16:00:00").time():
+        open_ = price
+        price *= 1 + rng.gauss(0, 0.0015)
+        bars[stamp.strftime('%Y-%m-%d %H:%M:%S')] = {
+            '1. open': f"{open_:.4f}",
+            '2. high': f"{max(open_, price) * 1.0005:.4f}",
+            '3. low': f"{min(open_, price) * 0.9995:.4f}",
+            '4. close': f"{price:.4f}",
+            '5. volume': str(int(1e4 + rng.random() * 5e5))
+        }
+        stamp += timedelta(minutes=minutes)
+    return dict(sorted(bars.items(), reverse=True))
+
+
+def synthetic_alpha_vantage(params: Dict[str, str]) -> Any:
+    function = params.get('function', '')
+    symbol = (params.get('symbol') or '').upper()
+    outputsize = params.get('outputsize', 'compact')
+    count = 1000 if outputsize == 'full' else 100
+
+    if function == 'TIME_SERIES_DAILY':
+        return {'Meta Data': {'2. Symbol': symbol}, 'Time Series (Daily)': synthetic_daily(symbol, count)}
+    if function == 'TIME_SERIES_INTRADAY':
+        interval = params.get('interval', '5min')
+        return {'Meta Data': {'2. Symbol': symbol}, f'Time Series ({interval})': synthetic_intraday(symbol, interval)}
+    if function in ('TIME_SERIES_WEEKLY', 'TIME_SERIES_MONTHLY'):
+        daily = synthetic_daily(symbol, 1000)
+        step = 5 if function == 'TIME_SERIES_WEEKLY' else 21
+        key = 'Weekly Time Series' if function == 'TIME_SERIES_WEEKLY' else 'Monthly Time Series'
+        return {'Meta Data': {'2. Symbol': symbol}, key: {d: daily[d] for d in list(daily)[::step]}}
+    if function == 'GLOBAL_QUOTE':
+        (day, latest), (_, previous) = list(synthetic_daily(symbol, 2).items())[:2]
+        close, prev_close = float(latest['4. close']), float(previous['4. close'])
+        return {'Global Quote': {
+            '01. symbol': symbol,
+            '02. open': latest['1. open'],
+            '03. high': latest['2. high'],
+            '04. low': latest['3. low'],
+            '05. price': latest['4. close'],
+            '06. volume': latest['5. volume'],
+            '07. latest trading day': day,
+            '08. previous close': previous['4. close'],
+            '09. change': f"{close - prev_close:.4f}",
+            '10. change percent': f"{(close / prev_close - 1) * 100:.4f}%"
+        }}
+    if function == 'SYMBOL_SEARCH':
+        keywords = (params.get('keywords') or '').lower()
+        matches = [
+            {'1. symbol': s, '2. name': n, '3. type': 'Equity', '4. region': 'United States', '9. matchScore': '1.0000'}
+            for s, n in read_listings(DEFAULT_LISTINGS_PATH)
+            if keywords and any(word in n.lower() or word == s.lower() for word in keywords.split())
+        ]
+        return {'bestMatches': matches[:10]}
+    return {'Error Message': f'Invalid API call: unknown function {function}'}
+
+
+def synthetic_finnhub(params: Dict[str, str]) -> Dict[str, Any]:
+    """Finnhub quote/candle payloads built from the same random walk as the Alpha Vantage ones"""
+    symbol = (params.get('symbol') or '').upper()
+    daily = synthetic_daily(symbol, 1000)
+    if params['function'] == 'quote':
+        (day, latest), (_, previous) = list(daily.items())[:2]
+        close, prev_close = float(latest['4. close']), float(previous['4. close'])
+        return {'c': close, 'd': close - prev_close, 'dp': (close / prev_close - 1) * 100,
+                'h': float(latest['2. high']), 'l': float(latest['3. low']), 'o': float(latest['1. open']),
+                'pc': prev_close, 't': int(datetime.fromisoformat(f"{day}T20:00:00+00:00").timestamp())}
+
+    start = datetime.fromtimestamp(int(params.get('from', 0)), timezone.utc).date().isoformat()
+    end = datetime.fromtimestamp(int(params.get('to', 2 ** 31)), timezone.utc).date().isoformat()
+    days = sorted(d for d in daily if start <= d <= end)
+    if not days:
+        return {'s': 'no_data'}
+    return {
+        's': 'ok',
+        't': [int(datetime.fromisoformat(f"{d}T00:00:00+00:00").timestamp()) for d in days],
+        'o': [float(daily[d]['1. open']) for d in days],
+        'h': [float(daily[d]['2. high']) for d in days],
+        'l': [float(daily[d]['3. low']) for d in days],
+        'c': [float(daily[d]['4. close']) for d in days],
+        'v': [int(daily[d]['5. volume']) for d in days]
+    }
+
+
+HEADLINES = [
+    '{name} beats earnings estimates as revenue climbs',
+    'Analyst upgrades {name} and raises price target',
+    '{name} shares slip after guidance disappoints',
+    '{name} announces partnership to expand into new markets',
+    '{name} faces lawsuit over product claims',
+    'What to watch as {name} heads into the week',
+    '{name} unveils new product lineup at annual event',
+    'Regulators open investigation into {name}'
+]
+
+
+def synthetic_news(params: Dict[str, str]) -> Dict[str, Any]:
+    query = params.get('q', '')
+    names = re.findall(r'"([^"]+)"', query) or [query]
+    name = names[0]
+    page_size = int(params.get('pageSize', 20))
+    since = params.get('from')
+    rng = _rng(query, 'news')
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    articles = []
+    for i in range(page_size):
+        published = now - timedelta(hours=i * 3 + rng.random() * 2)
+        stamp = published.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if since and stamp < since:
+            break
+        title = HEADLINES[(i + rng.randrange(len(HEADLINES))) % len(HEADLINES)].format(name=name)
+        articles.append({
+            'source': {'id': None, 'name': rng.choice(['Reuters', 'Bloomberg', 'CNBC', 'MarketWatch', 'Yahoo'])},
+            'title': title,
+            'description': f"{title}. Coverage of {name} from the replay server.",
+            'url': f"https://replay.local/{zlib.crc32(query.encode())}/{i}-{int(published.timestamp())}",
+            'publishedAt': stamp
+        })
+    return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+
+
+class ReplayServer:
+    """Threaded HTTP server answering /query (Alpha Vantage), /api/v1 (Finnhub) and /v2/everything (NewsAPI)"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fixtures_dir: Optional[str] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, note_rate: float = 0.0,
+                 record: bool = False, seed: Optional[int] = None):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.note_rate = note_rate
+        self.record = record
+        self.stats: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'ReplayServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def _fixture_path(self, provider: str, params: Dict[str, str]) -> Optional[str]:
+        if not self.fixtures_dir:
+            return None
+        if provider == 'newsapi':
+            parts = ['newsapi', params.get('q', '')]
+        else:
+            parts = [params.get('function', ''), params.get('symbol') or params.get('keywords', ''),
+                     params.get('interval', ''), params.get('outputsize', '')]
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', '_'.join(p for p in parts if p)).strip('_')
+        return os.path.join(self.fixtures_dir, f"{slug}.json")
+
+    def respond(self, provider: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        """(HTTP status, JSON body) for one upstream request, after fault injection"""
+        with self._lock:
+            self.stats[f"{provider}:{params.get('function', 'everything')}"] += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            return 503, {'message': 'replay: injected upstream error'}
+        if roll < self.error_rate + self.note_rate:
+            # Alpha Vantage throttles with a 200 and a Note, Finnhub with a 429
+            if provider == 'alpha_vantage':
+                return 200, {'Note': RATE_LIMIT_NOTE}
+            if provider == 'finnhub':
+                return 429, {'error': 'API limit reached'}
+
+        path = self._fixture_path(provider, params)
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return 200, json.load(f)
+        if self.record:
+            body = self._record(provider, params, path)
+        elif provider == 'newsapi':
+            body = synthetic_news(params)
+        elif provider == 'finnhub':
+            body = synthetic_finnhub(params)
+        else:
+            body = synthetic_alpha_vantage(params)
+        return 200, body
+
+    def _record(self, provider: str, params: Dict[str, str], path: Optional[str]) -> Any:
+        from .transport import HttpTransport
+        key_name, env_name = {
+            'newsapi': ('apiKey', 'NEWS_API_KEY'),
+            'finnhub': ('token', 'FINNHUB_API_KEY')
+        }.get(provider, ('apikey', 'ALPHA_VANTAGE_API_KEY'))
+        upstream = dict(params, **{key_name: os.environ[env_name]})
+        url = UPSTREAMS[provider]
+        if provider == 'finnhub':
+            url += upstream.pop('function')
+        body = HttpTransport(max_retries=1).get_json(url, upstream, timeout=30)
+        if path and 'Note' not in body and 'Information' not in body:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(body, f)
+        return body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                params.pop('apikey', None)
+                params.pop('apiKey', None)
+                params.pop('token', None)
+                if parsed.path == '/query':
+                    if params.get('function') == 'LISTING_STATUS':
+                        with open(DEFAULT_LISTINGS_PATH, 'rb') as f:
+                            return self._send(200, f.read(), 'text/csv')
+                    status, body = server.respond('alpha_vantage', params)
+                elif parsed.path in FINNHUB_ROUTES:
+                    status, body = server.respond('finnhub', dict(params, function=FINNHUB_ROUTES[parsed.path]))
+                elif parsed.path == '/v2/everything':
+                    status, body = server.respond('newsapi', params)
+                elif parsed.path == '/__stats':
+                    status, body = 200, dict(server.stats)
+                else:
+                    status, body = 404, {'message': f'replay: no route for {parsed.path}'}
+                self._send(status, json.dumps(body).encode('utf-8'), 'application/json')
+
+            def _send(self, status: int, payload: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Replay Alpha Vantage / Finnhub / NewsAPI payloads locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', help='directory of recorded JSON payloads')
+    parser.add_argument('--latency', type=float, default=0.0, help='base response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra uniform random delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 503')
+    parser.add_argument('--note-rate', type=float, default=0.0, help='fraction answered with a rate-limit response')
+    parser.add_argument('--record', action='store_true', help='fetch misses from the real APIs and save them')
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(args.host, args.port, args.fixtures, args.latency, args.jitter,
+                          args.error_rate, args.note_rate, args.record)
+    print(f"Replay server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
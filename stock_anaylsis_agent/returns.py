@@ -0,0 +1,260 @@
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .models import DailyBars
+
+# Legacy timeframes compare against a fixed number of sessions back
+SESSION_ALIASES = {
+    'today': (1, 'daily'), '1day': (1, 'daily'), '1d': (1, 'daily'), 'day': (1, 'daily'),
+    'week': (4, 'weekly'), '1week': (4, 'weekly'), '1w': (4, 'weekly'), '7days': (4, 'weekly'),
+    'month': (19, 'monthly'), '1month': (19, 'monthly'), '1m': (19, 'monthly'), '30days': (19, 'monthly')
+}
+
+# Intraday timeframes are measured on 1-minute bars rather than daily closes
+SINCE_OPEN_ALIASES = {'since open', 'since the open', 'since_open', 'open', 'session', 'intraday'}
+_MINUTE_UNITS = {'min': 1, 'mins': 1, 'minute': 1, 'minutes': 1, 'h': 60, 'hr': 60, 'hrs': 60, 'hour': 60, 'hours': 60}
+
+_SPEC_RE = re.compile(r'^(\d+)\s*(d|day|days|w|wk|week|weeks|m|mo|month|months|y|yr|year|years|'
+                      r'min|mins|minute|minutes|h|hr|hrs|hour|hours)$')
+_RANGE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})\s*(?::|to|\.\.)\s*(\d{4}-\d{2}-\d{2})$')
+
+# Phrases in a question mapped to a timeframe, first match wins; 'today' depends on the session
+_QUERY_TIMEFRAMES = [
+    (re.compile(r'(\d{4}-\d{2}-\d{2})\s*(?:to|until|through|-|:)\s*(\d{4}-\d{2}-\d{2})'), None),
+    (re.compile(r'\b(?:ytd|year to date|this year)\b'), 'ytd'),
+    # '200 day moving average' or '14-day RSI' names an indicator, not a lookback
+    (re.compile(r'\b(\d+)\s*-?\s*(min|mins|minutes?|h|hrs?|hours?|d|days?|w|wks?|weeks?|mo|months?|y|yrs?|years?)\b'
+                r'(?!\s*-?\s*(?:moving averages?|ma|sma|ema|rsi|atr)\b)'), None),
+    (re.compile(r'\b(?:last|past|this) hour\b'), '1h'),
+    (re.compile(r'\b(?:today|right now|this morning|this afternoon|so far|since (?:the )?open)\b'), 'today'),
+    (re.compile(r'\byesterday\b'), '1day'),
+    (re.compile(r'\bweek\b'), '1week'),
+    (re.compile(r'\bmonth\b'), '1month'),
+    (re.compile(r'\bquarter\b'), '3m'),
+    (re.compile(r'\byear\b'), '1y')
+]
+
+# Rows are packed into one sorted array; each row's day numbers are shifted by this much
+_ROW_SPAN = 1 << 20
+
+
+@dataclass(frozen=True)
+class Window:
+    """A lookback: N sessions, N calendar days/months back, year to date, a fixed date range,
+    or intraday N minutes back / since the regular-session open"""
+    kind: str
+    label: str
+    sessions: int = 0
+    days: int = 0
+    months: int = 0
+    start: Optional[str] = None
+    end: Optional[str] = None
+    minutes: int = 0
+
+    @property
+    def intraday(self) -> bool:
+        return self.kind in ('minutes', 'since_open')
+
+
+def parse_window(spec: str) -> Window:
+    """Parse a timeframe such as '1h', 'since open', '1week', '5d', '3m', '1y', 'ytd' or '2024-01-02:2024-06-28'"""
+    text = ' '.join(spec.strip().lower().split())
+    if text in SESSION_ALIASES:
+        sessions, label = SESSION_ALIASES[text]
+        return Window('sessions', label, sessions=sessions)
+    if text == 'ytd':
+        return Window('ytd', 'ytd')
+    if text in SINCE_OPEN_ALIASES:
+        return Window('since_open', 'since open')
+
+    match = _SPEC_RE.match(text)
+    if match:
+        n, unit = int(match.group(1)), match.group(2)
+        if n <= 0:
+            raise ValueError(f"Window length must be positive: {spec}")
+        if unit in _MINUTE_UNITS:
+            minutes = n * _MINUTE_UNITS[unit]
+            label = f"{minutes // 60}h" if minutes % 60 == 0 else f"{minutes}min"
+            return Window('minutes', label, minutes=minutes)
+        unit = unit[0]
+        label = f"{n}{unit}"
+        if unit == 'd':
+            return Window('sessions', label, sessions=n)
+        if unit == 'w':
+            return Window('calendar', label, days=7 * n)
+        return Window('calendar', label, months=n * (12 if unit == 'y' else 1))
+
+    match = _RANGE_RE.match(text)
+    if match:
+        start, end = match.groups()
+        if date.fromisoformat(start) >= date.fromisoformat(end):
+            raise ValueError(f"Range start must be before its end: {spec}")
+        return Window('range', f"{start}:{end}", start=start, end=end)
+
+    raise ValueError(f"Unsupported timeframe: {spec}. Supported: Nmin, Nh, since open, 1day, 1week, 1month, "
+                     f"Nd, Nw, Nm, Ny, ytd, YYYY-MM-DD:YYYY-MM-DD")
+
+
+def infer_timeframe(query: str, market_open: bool = False, default: str = '1week') -> str:
+    """Timeframe a free-text question asks about, as a parse_window spec
+
+    'today' means since the open while the market is open, else the last session.
+    """
+    text = query.lower()
+    for pattern, timeframe in _QUERY_TIMEFRAMES:
+        match = pattern.search(text)
+        if not match:
+            continue
+        if timeframe is None:
+            groups = match.groups()
+            timeframe = f"{groups[0]}:{groups[1]}" if '-' in groups[0] else f"{groups[0]}{groups[1]}"
+        elif timeframe == 'today':
+            timeframe = 'since open' if market_open else '1day'
+        try:
+            parse_window(timeframe)
+            return timeframe
+        except ValueError:
+            continue
+    return default
+
+
+class PriceSeries:
+    """Trading dates (day numbers) and closes of one ticker, oldest first"""
+
+    __slots__ = ('days', 'closes')
+
+    def __init__(self, days: np.ndarray, closes: np.ndarray):
+        self.days = days
+        self.closes = closes
+
+    @classmethod
+    def from_bars(cls, bars: DailyBars) -> 'PriceSeries':
+        # Zero-copy views over the store's packed columns
+        return cls(np.frombuffer(bars.columns['date'], dtype=np.int32).astype(np.int64),
+                   np.frombuffer(bars.columns['close'], dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def _shift_months(days: np.ndarray, months: int) -> np.ndarray:
+    """Same day of month, months earlier, clipped to the end of shorter months"""
+    d = days.astype('datetime64[D]')
+    month = d.astype('datetime64[M]')
+    day_of_month = d - month.astype('datetime64[D]')
+    shifted = month - months
+    last_day = (shifted + 1).astype('datetime64[D]') - 1
+    return np.minimum(shifted.astype('datetime64[D]') + day_of_month, last_day).astype(np.int64)
+
+
+def _to_day(value: str) -> int:
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+class ReturnTable:
+    """Price changes for tickers x windows; NaN where a ticker lacks the history"""
+
+    def __init__(self, tickers: List[str], windows: List[Window], start_days: np.ndarray, end_days: np.ndarray,
+                 start_close: np.ndarray, end_close: np.ndarray):
+        self.tickers = tickers
+        self.windows = windows
+        self.start_days = start_days
+        self.end_days = end_days
+        self.start_close = start_close
+        self.end_close = end_close
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.change = end_close - start_close
+            self.percent = self.change / start_close * 100
+
+    def result(self, ticker: str, window: int = 0) -> Optional[Dict[str, Any]]:
+        """One cell in the ticker_price_change response shape, or None without enough history"""
+        row = self.tickers.index(ticker)
+        if np.isnan(self.percent[row, window]):
+            return None
+        return {
+            'price_change': float(self.change[row, window]),
+            'percent_change': float(self.percent[row, window]),
+            'timeframe': self.windows[window].label,
+            'previous_close': float(self.start_close[row, window]),
+            'current_close': float(self.end_close[row, window]),
+            'current_date': str(np.datetime64(int(self.end_days[row, window]), 'D')),
+            'previous_date': str(np.datetime64(int(self.start_days[row, window]), 'D'))
+        }
+
+    def percent_rows(self) -> List[Dict[str, Any]]:
+        """Watchlist view: one dict per ticker mapping window label to percent change"""
+        rows = []
+        for i, ticker in enumerate(self.tickers):
+            row = {'ticker': ticker}
+            for j, window in enumerate(self.windows):
+                value = self.percent[i, j]
+                row[window.label] = None if np.isnan(value) else round(float(value), 2)
+            rows.append(row)
+        return rows
+
+
+def validate_windows(windows: Sequence[Window]) -> None:
+    """Raise ValueError unless every window can be measured on daily closes"""
+    intraday = [w.label for w in windows if w.intraday]
+    if intraday:
+        raise ValueError(f"Intraday timeframes need 1-minute bars, not daily closes: {', '.join(intraday)}")
+
+
+def returns_matrix(series: Dict[str, PriceSeries], windows: Sequence[Window]) -> ReturnTable:
+    """Compute every (ticker, window) return with a single gather over all series"""
+    tickers = list(series)
+    windows = list(windows)
+    validate_windows(windows)
+    lengths = np.array([len(series[t]) for t in tickers], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    rows = np.arange(len(tickers), dtype=np.int64)
+
+    # Shift each row's days into its own band so one searchsorted covers every ticker
+    flat_days = np.concatenate([series[t].days for t in tickers] or [np.empty(0, np.int64)])
+    flat_closes = np.concatenate([series[t].closes for t in tickers] or [np.empty(0, np.float64)])
+    keyed = flat_days + np.repeat(rows * _ROW_SPAN, lengths)
+
+    has_data = lengths > 0
+    last = np.where(has_data, offsets + lengths - 1, 0)
+    latest = np.where(has_data, flat_days[last] if len(flat_days) else 0, 0)
+
+    def locate(target_days: np.ndarray) -> np.ndarray:
+        """Index of the last bar on or before target_days in each row, -1 if none"""
+        idx = np.searchsorted(keyed, target_days + rows * _ROW_SPAN, side='right') - 1
+        return np.where(idx >= offsets, idx, -1)
+
+    start_idx = np.empty((len(tickers), len(windows)), dtype=np.int64)
+    end_idx = np.empty_like(start_idx)
+    for j, window in enumerate(windows):
+        end = last.copy()
+        if window.kind == 'sessions':
+            start = np.where(lengths > window.sessions, last - window.sessions, -1)
+        elif window.kind == 'calendar':
+            target = latest - window.days if window.days else _shift_months(latest, window.months)
+            start = locate(target)
+        elif window.kind == 'ytd':
+            year_start = latest.astype('datetime64[D]').astype('datetime64[Y]').astype('datetime64[D]')
+            start = locate(year_start.astype(np.int64) - 1)
+        else:
+            start = locate(np.full(len(tickers), _to_day(window.start), dtype=np.int64))
+            end = locate(np.full(len(tickers), _to_day(window.end), dtype=np.int64))
+        valid = has_data & (start >= 0) & (end > start)
+        start_idx[:, j] = np.where(valid, start, -1)
+        end_idx[:, j] = np.where(valid, end, -1)
+
+    missing = start_idx < 0
+    safe_start = np.where(missing, 0, start_idx)
+    safe_end = np.where(missing, 0, end_idx)
+    if len(flat_closes):
+        start_close = np.where(missing, np.nan, flat_closes[safe_start])
+        end_close = np.where(missing, np.nan, flat_closes[safe_end])
+        start_days = np.where(missing, 0, flat_days[safe_start])
+        end_days = np.where(missing, 0, flat_days[safe_end])
+    else:
+        start_close = end_close = np.full(start_idx.shape, np.nan)
+        start_days = end_days = np.zeros(start_idx.shape, dtype=np.int64)
+    return ReturnTable(tickers, windows, start_days, end_days, start_close, end_close)
@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, Optional, Tuple
+
+# Longest throttle wait batch jobs sit out; beyond it (a spent daily quota) they are reported as errors
+MAX_REQUEUE_WAIT = 120.0
+
+
+class RateLimitedError(Exception):
+    """Raised when a provider quota is exhausted, locally or as reported upstream (upstream=True)"""
+
+    def __init__(self, message: str, retry_after: float = 60.0, upstream: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.upstream = upstream
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity/period"""
+
+    def __init__(self, capacity: float, period: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available; otherwise return the seconds until they will be"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reports throttling we did not predict"""
+        with self._lock:
+            self._refill()
+            self._tokens = 0
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class SlidingWindow:
+    """Thread-safe cap of capacity calls in any trailing period, kept as a log of call times
+
+    Unlike a token bucket it never lends out capacity early, so a 25/day key gets
+    exactly 25 calls in every 24 hours.
+    """
+
+    def __init__(self, capacity: int, period: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.period = period
+        self.clock = clock
+        self._calls: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._calls and self._calls[0] <= now - self.period:
+            self._calls.popleft()
+
+    def try_acquire(self) -> float:
+        """Record a call if the window has room; otherwise return the seconds until it will"""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if len(self._calls) < self.capacity:
+                self._calls.append(now)
+                return 0.0
+            return self._calls[0] + self.period - now
+
+    def release(self) -> None:
+        """Give back the latest call, for one that was never made"""
+        with self._lock:
+            if self._calls:
+                self._calls.pop()
+
+    @property
+    def available(self) -> int:
+        with self._lock:
+            self._expire(self.clock())
+            return self.capacity - len(self._calls)
+
+
+class QuotaLimiter:
+    """Combined per-minute and per-day request quota for one provider; per_day=None means no daily cap"""
+
+    def __init__(self, per_minute: int, per_day: Optional[int], clock: Callable[[], float] = time.monotonic):
+        self.minute = TokenBucket(per_minute, 60.0, clock)
+        self.day = SlidingWindow(per_day, 24 * 3600.0, clock) if per_day else None
+
+    def acquire(self, timeout: float = 0) -> None:
+        """Block up to timeout seconds for a request slot, or raise RateLimitedError"""
+        wait = self.day.try_acquire() if self.day is not None else 0.0
+        if wait:
+            raise RateLimitedError('Daily API quota exhausted', retry_after=wait)
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.minute.try_acquire()
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                if self.day is not None:
+                    self.day.release()
+                raise RateLimitedError('Per-minute API quota exhausted', retry_after=wait)
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        """Record an upstream throttle response so local callers back off too"""
+        self.minute.drain()
+
+    @property
+    def remaining_today(self) -> Optional[int]:
+        return self.day.available if self.day is not None else None
+
+
+@dataclass(order=True)
+class _Job:
+    ready_at: float
+    priority: int
+    seq: int
+    key: Hashable = field(compare=False)
+    args: Tuple = field(compare=False, default=())
+    attempts: int = field(compare=False, default=0)
+
+
+class RequestScheduler:
+    """Prioritised, deduplicating job queue that requeues throttled results
+
+    handler(*args) returns a result dict; a result carrying 'throttled': True is
+    retried after retry_delay seconds instead of being reported, up to max_attempts.
+    One whose retry_after exceeds max_requeue_wait (a spent daily quota) is reported
+    straight away rather than holding a worker for hours.
+    """
+
+    def __init__(self, handler: Callable[..., Dict[str, Any]], workers: int = 2,
+                 max_attempts: int = 5, retry_delay: float = 15.0, max_requeue_wait: Optional[float] = None):
+        self.handler = handler
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_requeue_wait = max_requeue_wait
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = set()
+        self._results: 'queue.Queue[Tuple[Hashable, Dict[str, Any]]]' = queue.Queue()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f'stock-scheduler-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: Hashable, *args, priority: int = 0) -> bool:
+        """Queue a job; returns False if an identical key is already pending"""
+        with self._cond:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            heapq.heappush(self._heap, _Job(0.0, priority, next(self._seq), key, args))
+            self._cond.notify()
+            return True
+
+    def results(self) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """Yield (key, result) pairs as jobs finish until nothing is pending"""
+        while True:
+            with self._cond:
+                if not self._pending and self._results.empty():
+                    return
+            yield self._results.get()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0].ready_at - time.monotonic()
+                if wait <= 0:
+                    return heapq.heappop(self._heap)
+                self._cond.wait(wait)
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = self.handler(*job.args)
+            except Exception as e:
+                result = {'status': 'error', 'error_message': str(e)}
+
+            job.attempts += 1
+            retry_after = result.get('retry_after') or self.retry_delay
+            if (result.get('throttled') and job.attempts < self.max_attempts
+                    and (self.max_requeue_wait is None or retry_after <= self.max_requeue_wait)):
+                with self._cond:
+                    job.ready_at = time.monotonic() + retry_after
+                    heapq.heappush(self._heap, job)
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._pending.discard(job.key)
+                self._results.put((job.key, result))
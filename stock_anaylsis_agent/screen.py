@@ -0,0 +1,222 @@
+"""Headless bulk screener: price changes and indicators for a list of tickers
+
+    python -m stock_anaylsis_agent.screen tickers.txt -o results.csv
+    python -m stock_anaylsis_agent.screen tickers.txt -o results.jsonl --windows 1d,1w,1m,ytd --processes 8
+    python -m stock_anaylsis_agent.screen tickers.txt -o - --offline      # stored bars only, no API calls
+
+Daily bars are synced on a few threads through the agent's quota-aware request
+scheduler; tickers whose bars are ready are grouped into chunks and screened in a
+process pool, and every row is written as soon as its chunk finishes. google.adk
+is never imported, and with --offline neither is the agent.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .indicators import IndicatorSet
+from .returns import PriceSeries, Window, parse_window, returns_matrix, validate_windows
+from .scheduler import MAX_REQUEUE_WAIT
+from .store import DEFAULT_DATA_DIR, BarStore
+
+DEFAULT_WINDOWS = '1d,1w,1m,3m,1y,ytd'
+INDICATOR_FIELDS = ['sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'macd', 'rsi_14', 'daily_volatility_pct',
+                    'annualized_volatility_pct', 'atr_14', 'max_drawdown_pct', 'current_drawdown_pct', 'bars']
+
+# One BarStore per worker process, so its loaded-bar cache survives across chunks
+_stores: Dict[str, BarStore] = {}
+
+
+def read_tickers(path: str) -> List[str]:
+    """Tickers from a text or CSV file ('-' for stdin), first column, deduplicated in order"""
+    f = sys.stdin if path == '-' else open(path, newline='')
+    try:
+        tickers = []
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            ticker = row[0].strip().upper()
+            if ticker in ('TICKER', 'SYMBOL'):
+                continue
+            tickers.append(ticker)
+        return list(dict.fromkeys(tickers))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def screen_chunk(store_root: str, tickers: Sequence[str], windows: Sequence[Window]) -> List[Dict[str, Any]]:
+    """Screen tickers from the bar store; runs in a worker process"""
+    store = _stores.get(store_root)
+    if store is None:
+        store = _stores[store_root] = BarStore(store_root)
+
+    rows = {}
+    series = {}
+    for ticker in tickers:
+        bars = store.load(ticker)
+        if not len(bars):
+            rows[ticker] = {'ticker': ticker, 'status': 'error', 'error_message': 'No stored daily bars'}
+            continue
+        indicators = IndicatorSet()
+        c = bars.columns
+        for day, high, low, close in zip(c['date'], c['high'], c['low'], c['close']):
+            indicators.update(day, high, low, close)
+        snapshot = indicators.snapshot()
+        rows[ticker] = {'ticker': ticker, 'status': 'success', 'as_of': snapshot['as_of'],
+                        'close': snapshot['close'], **{name: snapshot[name] for name in INDICATOR_FIELDS}}
+        series[ticker] = PriceSeries.from_bars(bars)
+
+    # Every ticker in the chunk goes through a single vectorised returns computation
+    for row in returns_matrix(series, windows).percent_rows():
+        rows[row['ticker']].update(row)
+    return [rows[ticker] for ticker in tickers]
+
+
+class ResultWriter:
+    """Thread-safe CSV or JSONL sink that flushes every row"""
+
+    def __init__(self, path: str, fmt: str, windows: Sequence[Window]):
+        self.fmt = fmt
+        self._file = sys.stdout if path == '-' else open(path, 'w', newline='')
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self._csv = None
+        if fmt == 'csv':
+            fields = ['ticker', 'status', 'as_of', 'close'] + [w.label for w in windows] + INDICATOR_FIELDS + ['error_message']
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for row in rows:
+                if self._csv:
+                    self._csv.writerow(row)
+                else:
+                    self._file.write(json.dumps(row) + '\n')
+                self.written += 1
+                self.failed += row.get('status') != 'success'
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def _sync_handler():
+    """Scheduler handler that brings one ticker's bars up to date through the agent"""
+    from . import agent
+    from .scheduler import RateLimitedError
+
+    def sync(ticker: str) -> Dict[str, Any]:
+        try:
+            bars = agent.sync_daily_bars(ticker)
+        except RateLimitedError as e:
+            return agent._throttled_error(e)
+        if not len(bars):
+            return {'status': 'error', 'error_message': f'No daily data available for {ticker}'}
+        return {'status': 'success'}
+
+    return sync, agent.bar_store.root
+
+
+def run(tickers: List[str], writer: ResultWriter, windows: Sequence[Window], workers: int = 2,
+        processes: Optional[int] = None, chunk_size: int = 50, offline: bool = False,
+        max_wait: float = MAX_REQUEUE_WAIT) -> None:
+    """Sync and screen tickers, writing each chunk's rows as it completes"""
+    if offline:
+        store_root, scheduler = os.getenv('STOCK_AGENT_DATA_DIR', DEFAULT_DATA_DIR), None
+    else:
+        from .scheduler import RequestScheduler
+        handler, store_root = _sync_handler()
+        # Daily quota gone: waiting it out would stall the whole run
+        scheduler = RequestScheduler(handler, workers=workers, max_requeue_wait=max_wait)
+
+    # spawn keeps the workers free of the parent's threads, locks and sockets
+    pool = ProcessPoolExecutor(max_workers=processes or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn')) if processes != 0 else None
+
+    def finished(future: Future, chunk: List[str]) -> None:
+        try:
+            writer.write(future.result())
+        except Exception as e:
+            writer.write({'ticker': t, 'status': 'error', 'error_message': f"Screening failed: {e}"} for t in chunk)
+
+    def submit(chunk: List[str]) -> None:
+        if pool is None:
+            future = Future()
+            try:
+                future.set_result(screen_chunk(store_root, chunk, windows))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = pool.submit(screen_chunk, store_root, chunk, windows)
+        future.add_done_callback(lambda f, chunk=chunk: finished(f, chunk))
+
+    try:
+        if scheduler is None:
+            for i in range(0, len(tickers), chunk_size):
+                submit(tickers[i:i + chunk_size])
+        else:
+            for priority, ticker in enumerate(tickers):
+                scheduler.submit(ticker, ticker, priority=priority)
+            chunk = []
+            for ticker, result in scheduler.results():
+                if result.get('status') != 'success':
+                    writer.write([{'ticker': ticker, 'status': 'error', 'error_message': result.get('error_message')}])
+                    continue
+                chunk.append(ticker)
+                if len(chunk) >= chunk_size:
+                    submit(chunk)
+                    chunk = []
+            if chunk:
+                submit(chunk)
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Screen a list of tickers to CSV or JSONL')
+    parser.add_argument('tickers', help="file with one ticker per line (or a CSV whose first column is the ticker), '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='defaults to the output file extension, else jsonl')
+    parser.add_argument('--windows', default=DEFAULT_WINDOWS, help='comma-separated timeframes')
+    parser.add_argument('--workers', type=int, default=2, help='threads syncing bars within the API quota')
+    parser.add_argument('--processes', type=int, help='screening processes (default: CPU count, 0 to screen in-process)')
+    parser.add_argument('--chunk-size', type=int, default=50, help='tickers per screening task')
+    parser.add_argument('--max-wait', type=float, default=MAX_REQUEUE_WAIT,
+                        help='longest rate-limit wait to sit out before giving up on a ticker, in seconds')
+    parser.add_argument('--offline', action='store_true', help='screen stored bars only, without any API calls')
+    args = parser.parse_args(argv)
+
+    try:
+        windows = [parse_window(w) for w in args.windows.split(',') if w.strip()]
+        validate_windows(windows)
+    except ValueError as e:
+        parser.error(str(e))
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    tickers = read_tickers(args.tickers)
+
+    started = time.monotonic()
+    writer = ResultWriter(args.output, fmt, windows)
+    try:
+        run(tickers, writer, windows, workers=args.workers, processes=args.processes,
+            chunk_size=max(args.chunk_size, 1), offline=args.offline, max_wait=args.max_wait)
+    finally:
+        writer.close()
+    print(f"Screened {writer.written} tickers ({writer.failed} failed) in {time.monotonic() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+import threading
+from array import array
+from typing import Dict, Tuple
+
+from .models import COLUMNS, DailyBars
+
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser('~'), '.stock_analysis_agent', 'bars')
+
+
+class BarStore:
+    """Append-only on-disk store of daily bars, one directory of little-endian column files per ticker"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._loaded: Dict[str, Tuple[float, DailyBars]] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _lock(self, ticker: str) -> threading.RLock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.RLock())
+
+    def _column_path(self, ticker: str, column: str) -> str:
+        return os.path.join(self.root, ticker.upper(), f"{column}.bin")
+
+    def load(self, ticker: str) -> DailyBars:
+        """Stored bars for ticker; re-read from disk only when the files changed"""
+        ticker = ticker.upper()
+        date_path = self._column_path(ticker, 'date')
+        if not os.path.exists(date_path):
+            return DailyBars()
+        mtime = os.path.getmtime(date_path)
+        cached = self._loaded.get(ticker)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with self._lock(ticker):
+            columns = {}
+            for name, code in COLUMNS.items():
+                column = array(code)
+                with open(self._column_path(ticker, name), 'rb') as f:
+                    column.frombytes(f.read())
+                columns[name] = column
+            # A write interrupted half way leaves ragged columns; keep the complete rows
+            rows = min(len(column) for column in columns.values())
+            for column in columns.values():
+                del column[rows:]
+            bars = DailyBars(columns)
+            self._loaded[ticker] = (mtime, bars)
+            return bars
+
+    def append(self, ticker: str, bars: DailyBars) -> int:
+        """Append bars newer than the last stored date; returns how many were written"""
+        ticker = ticker.upper()
+        with self._lock(ticker):
+            existing = self.load(ticker)
+            new = bars.after(existing.columns['date'][-1] if len(existing) else None).columns
+            if not new['date']:
+                return 0
+
+            os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+            # Drop any partial rows from an interrupted write, then append;
+            # the date column goes last so its mtime marks a complete write
+            for name in list(COLUMNS)[1:] + ['date']:
+                with open(self._column_path(ticker, name), 'ab') as f:
+                    f.truncate(len(existing) * new[name].itemsize)
+                    new[name].tofile(f)
+            self._loaded.pop(ticker, None)
+            return len(new['date'])
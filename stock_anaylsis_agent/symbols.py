@@ -0,0 +1,242 @@
+import csv
+import difflib
+import io
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_LISTINGS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'listings.csv')
+
+# Colloquial names the listings don't spell out; the first alias of a ticker is its display name
+ALIASES = {
+    'tesla': 'TSLA',
+    'palantir': 'PLTR',
+    'nvidia': 'NVDA',
+    'apple': 'AAPL',
+    'microsoft': 'MSFT',
+    'amazon': 'AMZN',
+    'google': 'GOOGL',
+    'alphabet': 'GOOGL',
+    'meta': 'META',
+    'facebook': 'META',
+    'netflix': 'NFLX',
+    'amd': 'AMD',
+    'intel': 'INTC',
+    'walmart': 'WMT',
+    'disney': 'DIS',
+    'coca cola': 'KO',
+    'pepsi': 'PEP',
+    'boeing': 'BA',
+    'ford': 'F',
+    'general motors': 'GM',
+    'jp morgan': 'JPM',
+    'bank of america': 'BAC',
+    'wells fargo': 'WFC'
+}
+
+# Tickers recognised in any letter case; everything else must be written in capitals or as $TICKER
+POPULAR_TICKERS = {'TSLA', 'PLTR', 'NVDA', 'AAPL', 'MSFT', 'AMZN', 'GOOGL', 'META', 'NFLX', 'AMD', 'INTC',
+                   'WMT', 'DIS', 'KO', 'PEP', 'BA', 'F', 'GM', 'JPM', 'BAC', 'WFC'}
+
+# Words that never identify a company on their own
+COMMON_WORDS = {'stock', 'stocks', 'share', 'shares', 'price', 'prices', 'today', 'yesterday', 'week', 'month',
+                'year', 'why', 'did', 'does', 'drop', 'rise', 'up', 'down', 'change', 'how', 'is', 'the', 'what',
+                'doing', 'latest', 'news', 'on', 'for', 'and', 'of', 'in', 'a', 'an', 'to', 'target', 'trend',
+                'trends', 'compare', 'analyze', 'analysis', 'recent', 'performance', 'show', 'me', 'about',
+                'market', 'general', 'american', 'united', 'international', 'first', 'bank', 'new',
+                # Everyday words one typo away from a company name or spelling a listed ticker
+                'it', 'all', 'are', 'has', 'being', 'lower', 'investor', 'investors'}
+
+# Shorter words are too close to too many names for typo matching, e.g. 'them' and 'thermo'
+FUZZY_MIN_LENGTH = 5
+
+NAME_SUFFIXES = {'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'companies', 'ltd', 'limited',
+                 'plc', 'group', 'holding', 'holdings', 'sa', 'nv', 'ag', 'se', 'com', 'and', 'the'}
+
+# When an alias, a listing name and a bare first word spell the same tokens, the alias wins
+ALIAS, FULL_NAME, FIRST_WORD = 0, 1, 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Separators between the companies of a comparison, e.g. "JPM vs GS", "Google and Amazon"
+_LIST_SPLIT_RE = re.compile(r"\s+(?:vs\.?|versus|and|against|or|with)\s+|\s*[,&/]\s*|\s+\+\s+", re.IGNORECASE)
+_CLASS_RE = re.compile(r"\s+-\s+class\s+\w+.*$", re.IGNORECASE)
+_TERMINAL = ''
+
+
+class SymbolMatch(NamedTuple):
+    symbol: str
+    name: str
+    match_type: str
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def normalize_name(name: str) -> List[str]:
+    """Listing name to matchable tokens, e.g. 'Coca-Cola Co' -> ['coca', 'cola']"""
+    tokens = tokenize(_CLASS_RE.sub('', name))
+    while len(tokens) > 1 and tokens[-1] in NAME_SUFFIXES:
+        tokens.pop()
+    return tokens
+
+
+class SymbolIndex:
+    """Offline ticker resolver: token trie over company names plus a symbol table"""
+
+    def __init__(self, listings: Iterable[Tuple[str, str]] = (), aliases: Optional[Dict[str, str]] = None):
+        self._trie: Dict = {}
+        self._names: Dict[str, str] = {}
+        self._fuzzy: Dict[str, str] = {}
+        first_words: Dict[str, set] = {}
+
+        for alias, symbol in (aliases or {}).items():
+            self._names.setdefault(symbol, alias.title())
+            self._insert(tokenize(alias), symbol, ALIAS)
+
+        for symbol, name in listings:
+            self._names.setdefault(symbol, name)
+            tokens = normalize_name(name)
+            if tokens:
+                self._insert(tokens, symbol, FULL_NAME)
+                first_words.setdefault(tokens[0], set()).add(symbol)
+
+        # Bare first words only when they are unambiguous, e.g. 'palantir' but not 'general'
+        for word, symbols in first_words.items():
+            if len(symbols) == 1 and len(word) >= 4 and word not in COMMON_WORDS:
+                symbol = next(iter(symbols))
+                self._insert([word], symbol, FIRST_WORD)
+                self._fuzzy.setdefault(word, symbol)
+        for alias, symbol in (aliases or {}).items():
+            for word in tokenize(alias):
+                if len(word) >= 4 and word not in COMMON_WORDS:
+                    self._fuzzy.setdefault(word, symbol)
+        self._fuzzy_vocab = list(self._fuzzy)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._names
+
+    def name_for(self, symbol: str) -> Optional[str]:
+        return self._names.get(symbol.upper())
+
+    def _insert(self, tokens: List[str], symbol: str, priority: int) -> None:
+        if len(tokens) == 1 and tokens[0] in COMMON_WORDS:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        current = node.get(_TERMINAL)
+        if current is None or priority < current[1]:
+            node[_TERMINAL] = (symbol, priority)
+
+    def match_ticker(self, query: str) -> Optional[str]:
+        """Explicit ticker mentions: $TSLA, TSLA, or a popular ticker in any case"""
+        for raw in query.split():
+            word = raw.strip('.,!?;:()"\'')
+            if word.startswith('$'):
+                symbol = word[1:].upper()
+                if symbol in self._names:
+                    return symbol
+                continue
+            symbol = word.upper()
+            if symbol in POPULAR_TICKERS:
+                return symbol
+            if word.isupper() and len(word) > 1 and symbol in self._names and word.lower() not in COMMON_WORDS:
+                return symbol
+        return None
+
+    def match_name(self, query: str) -> Optional[str]:
+        """Longest company-name match, scanning the query left to right in one pass over the trie"""
+        tokens = tokenize(query)
+        best = None
+        for start in range(len(tokens)):
+            node = self._trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                terminal = node.get(_TERMINAL)
+                if terminal is not None:
+                    candidate = (start, -(end - start), terminal[1], terminal[0])
+                    if best is None or candidate < best:
+                        best = candidate
+        return best[3] if best else None
+
+    def match_fuzzy(self, query: str, cutoff: float = 0.8) -> Optional[str]:
+        """Typo-tolerant match of single words against known company names"""
+        for token in tokenize(query):
+            if len(token) < FUZZY_MIN_LENGTH or token in COMMON_WORDS:
+                continue
+            close = difflib.get_close_matches(token, self._fuzzy_vocab, n=1, cutoff=cutoff)
+            if close:
+                return self._fuzzy[close[0]]
+        return None
+
+    def resolve(self, query: str) -> Optional[SymbolMatch]:
+        for match_type, matcher in (('ticker', self.match_ticker), ('name', self.match_name),
+                                    ('fuzzy', self.match_fuzzy)):
+            symbol = matcher(query)
+            if symbol:
+                return SymbolMatch(symbol, self.name_for(symbol) or symbol, match_type)
+        return None
+
+    def resolve_all(self, query: str, limit: int = 10) -> List[SymbolMatch]:
+        """Every company a query names, in order, e.g. both of 'Compare Google and Amazon'"""
+        whole = self.resolve(query)
+        matches = {}
+        for part in _LIST_SPLIT_RE.split(query):
+            match = self.resolve(part) if part.strip() else None
+            if match and match.symbol not in matches:
+                matches[match.symbol] = match
+        # A name containing a separator ("Bank of America", "Johnson & Johnson") resolves whole
+        if len(matches) < 2 or (whole and whole.match_type == 'name' and whole.symbol not in matches):
+            return [whole] if whole else []
+        return list(matches.values())[:limit]
+
+
+def read_listings(path: str) -> List[Tuple[str, str]]:
+    """Read an Alpha Vantage LISTING_STATUS style CSV, keeping active listings"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return _parse_listings(f)
+
+
+def _parse_listings(lines) -> List[Tuple[str, str]]:
+    listings = []
+    for row in csv.DictReader(lines):
+        if row.get('status', 'Active').lower() != 'active':
+            continue
+        symbol, name = (row.get('symbol') or '').strip(), (row.get('name') or '').strip()
+        if symbol and name:
+            listings.append((symbol.upper(), name))
+    return listings
+
+
+def refresh_listings(transport, api_key: str, path: str, url: str = 'https://www.alphavantage.co/query') -> int:
+    """Download the full Alpha Vantage LISTING_STATUS dump to path; returns the row count"""
+    text = transport.get_text(url,
+                              {'function': 'LISTING_STATUS', 'apikey': api_key}, timeout=60)
+    listings = _parse_listings(io.StringIO(text))
+    if not listings:
+        raise ValueError('LISTING_STATUS returned no active listings')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return len(listings)
+
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Process-wide index, loaded once from SYMBOL_LISTINGS_PATH or the bundled listings"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = os.getenv('SYMBOL_LISTINGS_PATH', DEFAULT_LISTINGS_PATH)
+                _index = SymbolIndex(read_listings(path), ALIASES)
+    return _index
@@ -0,0 +1,366 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = 'stock_agent_'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('stock_agent_span', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Span:
+    """One timed operation in a trace; children share the trace_id of the span they ran under"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start', 'duration', 'attributes', 'status', 'error')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': self.duration * 1000 if self.duration is not None else None,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Telemetry:
+    """Counters, latency histograms, gauges and spans for the tools and their upstream calls
+
+    Tools are wrapped with @telemetry.tool; upstream requests go through
+    telemetry.upstream(). Export with render_prometheus() and spans(), or serve
+    /metrics and /traces over HTTP with serve().
+    """
+
+    def __init__(self, max_spans: int = 1000, trace_file: Optional[str] = None,
+                 profile_tools: Iterable[str] = ()):
+        self.max_spans = max_spans
+        self.trace_file = trace_file
+        self.profile_tools = {t.strip() for t in profile_tools if t.strip()}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._help: Dict[str, str] = {}
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+        # Only one profiler can be active per process, so profiled calls take turns
+        self._profile_lock = threading.Lock()
+        self._profiles: Dict[str, cProfile.Profile] = {}
+
+    def inc(self, name: str, value: float = 1, help: str = '', **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = '', **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+            self._help.setdefault(name, help)
+
+    def gauge(self, name: str, read: Callable[[], Any], help: str = '') -> None:
+        """Register a gauge read at export time; read() returns a number or [(labels dict, number), ...]"""
+        with self._lock:
+            self._gauges[name] = read
+            self._help[name] = help
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_labels(labels))
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time a block as a span nested under the current one"""
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        self._spans.append(span)
+        if self.trace_file:
+            line = json.dumps(span.to_dict(), default=str)
+            with self._trace_lock, open(self.trace_file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def spans(self, limit: int = 100, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent finished spans, newest first"""
+        selected = [s for s in reversed(self._spans) if trace_id is None or s.trace_id == trace_id]
+        return [s.to_dict() for s in selected[:limit]]
+
+    def tool(self, fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        """Decorator recording latency, outcome and a span for every call of an agent tool"""
+        name = fn.__name__
+        params = list(inspect.signature(fn).parameters)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            attributes = {k: v for k, v in zip(params, args) if isinstance(v, (str, int, float))}
+            attributes.update((k, v) for k, v in kwargs.items() if isinstance(v, (str, int, float)))
+            started = time.perf_counter()
+            status = 'exception'
+            with self.span(f'tool.{name}', **attributes) as span:
+                try:
+                    result = self._call(name, fn, args, kwargs)
+                    status = _result_status(result)
+                    if status != 'success':
+                        span.status = status
+                        span.error = result.get('error_message') if isinstance(result, dict) else None
+                    return result
+                finally:
+                    elapsed = time.perf_counter() - started
+                    self.inc('tool_calls_total', help='Agent tool calls by outcome', tool=name, status=status)
+                    self.observe('tool_latency_seconds', elapsed, help='Agent tool latency', tool=name)
+
+        return wrapper
+
+    def _call(self, name: str, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        if not (name in self.profile_tools or '*' in self.profile_tools):
+            return fn(*args, **kwargs)
+        # Nested or concurrent calls run unprofiled rather than wait for the profiler
+        if not self._profile_lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            self._profile_lock.release()
+
+    def profile_report(self, tool: str, limit: int = 25, sort: str = 'cumulative') -> str:
+        """pstats listing of the hottest functions across all profiled calls of tool"""
+        profile = self._profiles.get(tool)
+        if profile is None:
+            return f"No profile recorded for {tool}; add it to STOCK_AGENT_PROFILE_TOOLS"
+        out = io.StringIO()
+        with self._profile_lock:
+            pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump_profiles(self, directory: str) -> List[str]:
+        """Write each tool's accumulated profile as a .prof file for snakeviz/pstats"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._profile_lock:
+            for tool, profile in self._profiles.items():
+                path = os.path.join(directory, f'{tool}.prof')
+                profile.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def upstream(self, provider: str, function: str, request: Callable[[], Any],
+                 decode: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """Run request() (returning an HTTP response), record its latency and size, and decode the body
+
+        decode(raw_bytes) defaults to plain JSON decoding.
+        """
+        started = time.perf_counter()
+        outcome = 'error'
+        with self.span(f'upstream.{provider}', provider=provider, function=function) as span:
+            try:
+                response = request()
+                size = len(response.content)
+                span.attributes['bytes'] = size
+                self.inc('upstream_response_bytes_total', size, help='Upstream response payload bytes',
+                         provider=provider, function=function)
+                data = decode(response.content) if decode else response.json()
+                outcome = 'success'
+                return data
+            finally:
+                self.inc('upstream_requests_total', help='Upstream HTTP requests by outcome',
+                         provider=provider, function=function, outcome=outcome)
+                self.observe('upstream_latency_seconds', time.perf_counter() - started,
+                             help='Upstream request latency including retries', provider=provider, function=function)
+
+    def throttled(self, provider: str) -> None:
+        self.inc('upstream_throttled_total', help='Upstream rate-limit responses', provider=provider)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: (list(h.counts), h.sum, h.count, h.buckets) for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+            gauges = dict(self._gauges)
+            help_text = dict(self._help)
+
+        for name, series in sorted(counters.items()):
+            full = PREFIX + name
+            lines += [f"# HELP {full} {help_text.get(name) or name}", f"# TYPE {full} counter"]
+            lines += [f"{full}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(series.items())]
+
+        for name, series in sorted(histograms.items()):
+            full = PREFIX + name
+            lines += [f"# HELP {full} {help_text.get(name) or name}", f"# TYPE {full} histogram"]
+            for key, (counts, total, count, buckets) in sorted(series.items()):
+                cumulative = 0
+                for bound, n in zip(buckets + (float('inf'),), counts):
+                    cumulative += n
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{full}_sum{_format_labels(key)} {total!r}")
+                lines.append(f"{full}_count{_format_labels(key)} {count}")
+
+        for name, read in sorted(gauges.items()):
+            full = PREFIX + name
+            try:
+                value = read()
+            except Exception as e:
+                # Skip the gauge but say why, so a broken callback does not just vanish from /metrics
+                print(f"Gauge {name} failed: {e!r}")
+                continue
+            lines += [f"# HELP {full} {help_text.get(name) or name}", f"# TYPE {full} gauge"]
+            samples = value if isinstance(value, list) else [({}, value)]
+            lines += [f"{full}{_format_labels(_labels(labels))} {_format_value(v)}" for labels, v in samples]
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-tool call counts and approximate p50/p95 latency in ms, for logs and the CLI"""
+        with self._lock:
+            histograms = dict(self._histograms.get('tool_latency_seconds', {}))
+        tools = {}
+        for key, histogram in histograms.items():
+            tool = dict(key)['tool']
+            tools[tool] = {
+                'calls': histogram.count,
+                'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else None,
+                'p50_ms_le': histogram.quantile(0.5) * 1000,
+                'p95_ms_le': histogram.quantile(0.95) * 1000
+            }
+        return tools
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Expose /metrics (Prometheus) and /traces (recent spans as JSON) on a background thread"""
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics'):
+                    body, content_type = telemetry.render_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path.startswith('/traces'):
+                    body, content_type = json.dumps(telemetry.spans(), default=str), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='telemetry-http', daemon=True).start()
+        return server
+
+
+def _result_status(result: Any) -> str:
+    if not isinstance(result, dict):
+        return 'success'
+    if result.get('throttled'):
+        return 'throttled'
+    return result.get('status', 'success')
@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # optional, the async client falls back to the sync pool
+    httpx = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'User-Agent': 'stock-analysis-agent/1.0'
+}
+
+
+class TransportError(Exception):
+    """Raised when an upstream request still fails after all retries"""
+
+
+class HttpTransport:
+    """Shared keep-alive HTTP client with bounded, jittered retries"""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_cap: float = 8.0,
+                 pool_connections: int = 4, pool_maxsize: int = 16):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_maxsize = pool_maxsize
+
+        # One connection pool per host, reused across calls and threads
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._async_client = None
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> Any:
+        """GET url with encoded query params and return the decoded JSON body"""
+        return self.get(url, params, timeout).json()
+
+    def get_text(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> str:
+        """GET url and return the body as text, e.g. for CSV endpoints"""
+        return self.get(url, params, timeout).text
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+            before_attempt: Optional[Callable[[float], None]] = None, budget: Optional[float] = None) -> requests.Response:
+        """GET url, retrying transient failures, and return the successful response
+
+        before_attempt(seconds_left) runs before every attempt, e.g. to take a quota slot
+        for each metered request; with budget, attempts stop once that many seconds have passed.
+        """
+        params = _clean_params(params)
+        deadline = time.monotonic() + budget if budget is not None else None
+        remaining = lambda: timeout if deadline is None else min(timeout, max(deadline - time.monotonic(), 0.1))
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if before_attempt is not None:
+                before_attempt(remaining())
+            try:
+                response = self.session.get(url, params=params, timeout=remaining())
+                if response.status_code in RETRY_STATUSES:
+                    last_error = TransportError(f"HTTP {response.status_code} from {url}")
+                else:
+                    response.raise_for_status()
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            if attempt == self.max_retries:
+                break
+            pause = self.backoff(attempt)
+            if deadline is not None and time.monotonic() + pause >= deadline:
+                break
+            time.sleep(pause)
+        raise TransportError(f"Request to {url} failed after {attempt + 1} attempts: {last_error}")
+
+    async def get_json_async(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                             before_attempt: Optional[Callable[[float], None]] = None,
+                             budget: Optional[float] = None) -> Any:
+        """Async GET with the same retry, metering and budget policy, using httpx when it is installed"""
+        if httpx is None:
+            return await asyncio.to_thread(lambda: self.get(url, params, timeout, before_attempt, budget).json())
+
+        client = self._get_async_client()
+        params = _clean_params(params)
+        deadline = time.monotonic() + budget if budget is not None else None
+        remaining = lambda: timeout if deadline is None else min(timeout, max(deadline - time.monotonic(), 0.1))
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if before_attempt is not None:
+                # Quota limiters block while they wait for a slot; keep that off the event loop
+                await asyncio.to_thread(before_attempt, remaining())
+            try:
+                response = await client.get(url, params=params, timeout=remaining())
+                if response.status_code in RETRY_STATUSES:
+                    last_error = TransportError(f"HTTP {response.status_code} from {url}")
+                else:
+                    response.raise_for_status()
+                    return response.json()
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                last_error = e
+            if attempt == self.max_retries:
+                break
+            pause = self.backoff(attempt)
+            if deadline is not None and time.monotonic() + pause >= deadline:
+                break
+            await asyncio.sleep(pause)
+        raise TransportError(f"Request to {url} failed after {attempt + 1} attempts: {last_error}")
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+            self._async_client = httpx.AsyncClient(headers=DEFAULT_HEADERS, limits=limits)
+        return self._async_client
+
+    def close(self) -> None:
+        self.session.close()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def _clean_params(params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if params is None:
+        return None
+    return {k: v for k, v in params.items() if v is not None}
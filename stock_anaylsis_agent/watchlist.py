@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import MARKET_CLOSE, MARKET_OPEN, MARKET_TZ, is_market_open, next_session_boundary
+from .models import Quote
+from .scheduler import QuotaLimiter, RateLimitedError
+
+# Regular session length, used to spread the daily call budget over trading hours
+SESSION_SECONDS = 6.5 * 3600
+# Oldest polled quote served as live during the session, in seconds
+MAX_QUOTE_AGE = 60.0
+
+
+class QuoteDelta:
+    __slots__ = ('ticker', 'price', 'previous_price', 'delta', 'updated_at')
+
+    def __init__(self, ticker: str, price: float, previous_price: Optional[float], updated_at: float):
+        self.ticker = ticker
+        self.price = price
+        self.previous_price = previous_price
+        self.delta = price - previous_price if previous_price is not None else 0.0
+        self.updated_at = updated_at
+
+    def __repr__(self) -> str:
+        return f"QuoteDelta({self.ticker} {self.price:.2f} {self.delta:+.2f})"
+
+
+class WatchlistPoller:
+    """Background thread that keeps quotes for a fixed symbol set fresh within a share of the API quota
+
+    fetch_quote(ticker) returns a Quote, or None for an unknown ticker, and raises
+    RateLimitedError when throttled.
+    """
+
+    def __init__(self, fetch_quote: Callable[[str], Optional[Quote]], symbols: Iterable[str], quota: QuotaLimiter,
+                 budget_fraction: float = 0.5, max_age: float = MAX_QUOTE_AGE):
+        self.fetch_quote = fetch_quote
+        self.max_age = max_age
+        self.symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        # Space calls so the watchlist never uses more than its share of either quota window
+        per_minute = max(quota.minute.capacity * budget_fraction, 1e-9)
+        self.interval = 60.0 / per_minute
+        if quota.day is not None:
+            self.interval = max(self.interval, SESSION_SECONDS / max(quota.day.capacity * budget_fraction, 1e-9))
+        self.table: Dict[str, Quote] = {}
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[Set[str]]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed_polled: Set[str] = set()
+
+    @property
+    def cycle_seconds(self) -> float:
+        return self.interval * max(len(self.symbols), 1)
+
+    @property
+    def polls_session(self) -> bool:
+        """Whether the budget revisits every symbol within max_age, so session quotes can be served live"""
+        return self.cycle_seconds <= self.max_age
+
+    def start(self) -> None:
+        if self._thread is None and self.symbols:
+            self._thread = threading.Thread(target=self._run, name='watchlist-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def lookup(self, ticker: str) -> Optional[Quote]:
+        """The live quote for ticker if it is still current, else None"""
+        quote = self.table.get(ticker.upper())
+        if quote is None:
+            return None
+        if is_market_open():
+            # A slow polling cycle must not pass old quotes off as live; callers fetch instead
+            return quote if time.time() - quote.fetched_at <= min(self.cycle_seconds * 1.5, self.max_age) else None
+        # Outside the session a quote taken after the last close stays valid until the open
+        return quote if ticker.upper() in self._closed_polled else None
+
+    def _run(self) -> None:
+        position = 0
+        while not self._stop.is_set():
+            if not is_market_open():
+                pending = [s for s in self.symbols if s not in self._closed_polled]
+                if not pending:
+                    # Everything already reflects the close; sleep until the next session
+                    now = datetime.now(MARKET_TZ)
+                    self._stop.wait(min((next_session_boundary(now, MARKET_OPEN) - now).total_seconds(), 3600))
+                    if is_market_open():
+                        self._closed_polled.clear()
+                    continue
+                ticker = pending[0]
+            else:
+                self._closed_polled.clear()
+                if not self.polls_session:
+                    # Quotes this far apart would be too old to serve; leave the quota to callers until the close
+                    now = datetime.now(MARKET_TZ)
+                    self._stop.wait(min(max((next_session_boundary(now, MARKET_CLOSE) - now).total_seconds(), 1.0), 3600))
+                    continue
+                ticker = self.symbols[position % len(self.symbols)]
+                position += 1
+
+            wait = self.interval
+            try:
+                self._poll(ticker)
+            except RateLimitedError as e:
+                wait = max(wait, e.retry_after)
+            except Exception as e:
+                print(f"Watchlist poll failed for {ticker}: {e}")
+            self._stop.wait(wait)
+
+    def _poll(self, ticker: str) -> None:
+        quote = self.fetch_quote(ticker)
+        if quote is None:
+            raise ValueError('quote unavailable')
+
+        previous = self.table.get(ticker)
+        self.table[ticker] = quote
+        if not is_market_open():
+            self._closed_polled.add(ticker)
+        if previous is None or previous.price != quote.price:
+            self._publish(QuoteDelta(ticker, quote.price, previous.price if previous else None, quote.fetched_at))
+
+    def _publish(self, delta: QuoteDelta) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue, symbols in subscribers:
+            if symbols is None or delta.ticker in symbols:
+                try:
+                    loop.call_soon_threadsafe(_offer, queue, delta)
+                except RuntimeError:
+                    pass  # subscriber's event loop already closed
+
+    async def subscribe(self, symbols: Optional[Iterable[str]] = None) -> AsyncIterator[QuoteDelta]:
+        """Stream price deltas for symbols (default: all watched) as the poller observes them"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        entry = (asyncio.get_running_loop(), queue, {s.upper() for s in symbols} if symbols else None)
+        with self._lock:
+            self._subscribers.append(entry)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            with self._lock:
+                self._subscribers.remove(entry)
+
+
+def _offer(queue: asyncio.Queue, item) -> None:
+    """Put without blocking; a slow consumer loses its oldest deltas first"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
@@ -0,0 +1,34 @@
+import time
+
+from stock_anaylsis_agent.cache import CacheKey, ResponseCache
+
+KEY = CacheKey('alpha_vantage', 'GLOBAL_QUOTE', 'AAPL')
+
+
+def test_stale_serve_is_counted_once():
+    cache = ResponseCache(stale_grace=60)
+    cache.set(KEY, 'old', ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get_or_fetch(KEY, lambda: 'new') == 'old'
+    cache._refresher.shutdown(wait=True)
+    assert (cache.hits, cache.stale_hits, cache.misses) == (0, 1, 0)
+
+    assert cache.get_or_fetch(KEY, lambda: 'newer') == 'new'
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 0)
+
+
+def test_refresh_skips_a_key_refreshed_meanwhile():
+    cache = ResponseCache(stale_grace=60)
+    cache.set(KEY, 'fresh', ttl=60)
+    calls = []
+    cache._refresh(KEY, lambda: calls.append(1) or 'refetched', lambda value: True)
+    assert calls == []
+    assert (cache.hits, cache.stale_hits, cache.misses) == (0, 0, 0)
+
+
+def test_miss_then_hit():
+    cache = ResponseCache()
+    assert cache.get_or_fetch(KEY, lambda: 'value') == 'value'
+    assert cache.get_or_fetch(KEY, lambda: 'other') == 'value'
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 0, 1)
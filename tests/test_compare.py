@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from stock_anaylsis_agent.compare import AlignedCloses, pairwise_stats, rolling_pairwise_stats
+from stock_anaylsis_agent.returns import PriceSeries
+
+
+def _series(days, closes) -> PriceSeries:
+    return PriceSeries(np.array(days, dtype=np.int64), np.array(closes, dtype=np.float64))
+
+
+def _pair_reference(x: np.ndarray, y: np.ndarray):
+    """Correlation and beta of x against y over the sessions both have"""
+    both = np.isfinite(x) & np.isfinite(y)
+    x, y = x[both], y[both]
+    return np.corrcoef(x, y)[0, 1], np.cov(x, y)[0, 1] / np.var(y, ddof=1)
+
+
+def test_align_forward_fills_gaps_and_leaves_leading_nan():
+    series = {
+        'A': _series([1, 2, 3, 4, 5], [10, 11, 12, 13, 14]),
+        'B': _series([1, 3, 5], [20, 21, 22]),
+        'C': _series([3, 4, 5, 6], [30, 31, 32, 33])
+    }
+    aligned = AlignedCloses.align(series, 2, 5)
+    assert aligned.tickers == ['A', 'B', 'C']
+    assert list(aligned.days) == [2, 3, 4, 5]
+    np.testing.assert_array_equal(aligned.closes[:, 0], [11, 12, 13, 14])
+    # B skipped days 2 and 4: its day-1 close is outside the range, so only day 4 is filled, from day 3
+    np.testing.assert_array_equal(aligned.closes[:, 1], [np.nan, 21, 21, 22])
+    np.testing.assert_array_equal(aligned.closes[:, 2], [np.nan, 30, 31, 32])
+
+    returns = aligned.returns()
+    assert returns.shape == (3, 3)
+    assert np.isnan(returns[0, 1]) and np.isnan(returns[0, 2])
+    assert returns[1, 1] == 0.0
+
+
+def test_pairwise_stats_matches_per_pair_reference_with_gaps():
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0, 0.02, size=(120, 4))
+    returns[:30, 1] = np.nan
+    returns[rng.choice(120, 15, replace=False), 2] = np.nan
+    returns[:, 3] = 1.5 * returns[:, 0] + rng.normal(0, 0.005, 120)
+
+    correlation, beta = pairwise_stats(returns)
+    for i in range(4):
+        for j in range(4):
+            expected_correlation, expected_beta = _pair_reference(returns[:, i], returns[:, j])
+            assert correlation[i, j] == pytest.approx(expected_correlation, abs=1e-12)
+            assert beta[i, j] == pytest.approx(expected_beta, abs=1e-12)
+    assert beta[3, 0] == pytest.approx(1.5, abs=0.05)
+
+
+def test_pairwise_stats_needs_min_periods_of_overlap():
+    returns = np.array([[0.01, np.nan], [0.02, np.nan], [-0.01, 0.03], [0.00, np.nan]])
+    correlation, beta = pairwise_stats(returns, min_periods=2)
+    assert np.isnan(correlation[0, 1]) and np.isnan(beta[0, 1])
+    assert np.isfinite(correlation[0, 0])
+
+
+def test_rolling_end_rows_and_windows():
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0, 0.01, size=(10, 2))
+    returns[6, 1] = np.nan
+
+    ends, correlation, beta = rolling_pairwise_stats(returns, window=4, max_points=3)
+    # Seven possible windows sampled every third session, always including the latest
+    assert list(ends) == [4, 7, 10]
+    for k, end in enumerate(ends):
+        expected_correlation, expected_beta = pairwise_stats(returns[end - 4:end], min_periods=2)
+        np.testing.assert_allclose(correlation[k], expected_correlation, atol=1e-12)
+        np.testing.assert_allclose(beta[k], expected_beta, atol=1e-12)
+
+    ends, correlation, _ = rolling_pairwise_stats(returns, window=4)
+    assert list(ends) == list(range(4, 11))
+    assert correlation.shape == (7, 2, 2)
+
+
+def test_rolling_with_fewer_sessions_than_the_window():
+    ends, correlation, beta = rolling_pairwise_stats(np.zeros((3, 2)), window=5)
+    assert len(ends) == 0
+    assert correlation.shape == beta.shape == (0, 2, 2)
@@ -0,0 +1,97 @@
+from array import array
+
+import numpy as np
+import pytest
+
+from stock_anaylsis_agent.indicators import IndicatorEngine, IndicatorSet
+from stock_anaylsis_agent.models import DailyBars
+
+
+def _bars(n: int, seed: int = 7) -> DailyBars:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    high = close * (1 + rng.uniform(0, 0.02, n))
+    low = close * (1 - rng.uniform(0, 0.02, n))
+    return DailyBars({
+        'date': array('i', range(19000, 19000 + n)),
+        'open': array('d', close),
+        'high': array('d', high),
+        'low': array('d', low),
+        'close': array('d', close),
+        'volume': array('q', [1000] * n)
+    })
+
+
+def _head(bars: DailyBars, n: int) -> DailyBars:
+    return DailyBars({name: column[:n] for name, column in bars.columns.items()})
+
+
+def _ema(closes: np.ndarray, period: int) -> float:
+    value = closes[:period].mean()
+    for x in closes[period:]:
+        value += 2 / (period + 1) * (x - value)
+    return value
+
+
+def _rsi(closes: np.ndarray, period: int = 14) -> float:
+    delta = np.diff(closes)
+    gains, losses = np.maximum(delta, 0), np.maximum(-delta, 0)
+    gain, loss = gains[:period].mean(), losses[:period].mean()
+    for g, l in zip(gains[period:], losses[period:]):
+        gain = (gain * (period - 1) + g) / period
+        loss = (loss * (period - 1) + l) / period
+    return 100 - 100 / (1 + gain / loss)
+
+
+def test_incremental_updates_match_full_recompute():
+    bars = _bars(320)
+    engine = IndicatorEngine()
+    # Feed the history in uneven batches, as a store growing by delta syncs would
+    for n in (30, 31, 150, 151, 260, 320):
+        incremental = engine.update('abc', _head(bars, n)).snapshot()
+    full = IndicatorEngine().update('ABC', bars).snapshot()
+    assert incremental.keys() == full.keys()
+    for name, value in full.items():
+        assert incremental[name] == pytest.approx(value, rel=1e-9), name
+
+
+def test_indicators_match_reference_values():
+    bars = _bars(320)
+    closes = np.frombuffer(bars.columns['close'], dtype=np.float64)
+    engine = IndicatorEngine()
+    engine.update('ABC', _head(bars, 200))
+    snapshot = engine.update('ABC', bars).snapshot()
+
+    assert snapshot['sma_20'] == pytest.approx(closes[-20:].mean(), rel=1e-9)
+    assert snapshot['sma_50'] == pytest.approx(closes[-50:].mean(), rel=1e-9)
+    assert snapshot['sma_200'] == pytest.approx(closes[-200:].mean(), rel=1e-9)
+    assert snapshot['ema_12'] == pytest.approx(_ema(closes, 12), rel=1e-9)
+    assert snapshot['ema_26'] == pytest.approx(_ema(closes, 26), rel=1e-9)
+    assert snapshot['macd'] == pytest.approx(_ema(closes, 12) - _ema(closes, 26), rel=1e-6)
+    assert snapshot['rsi_14'] == pytest.approx(_rsi(closes), rel=1e-9)
+    returns = closes[-21:][1:] / closes[-21:][:-1] - 1
+    assert snapshot['daily_volatility_pct'] == pytest.approx(returns.std(ddof=1) * 100, rel=1e-6)
+    assert snapshot['bars'] == 320
+
+
+def test_not_enough_bars_leaves_indicators_unset():
+    snapshot = IndicatorEngine().update('ABC', _bars(15)).snapshot()
+    assert snapshot['sma_20'] is None
+    assert snapshot['ema_12'] is not None
+    assert snapshot['ema_26'] is None
+    assert snapshot['rsi_14'] is not None
+    assert snapshot['macd'] is None
+
+
+def test_rebuilt_store_starts_over():
+    bars = _bars(100)
+    engine = IndicatorEngine()
+    engine.update('ABC', bars)
+    state = engine.update('ABC', _head(bars, 40))
+    assert state.bars == 40
+
+    expected = IndicatorSet()
+    c = bars.columns
+    for i in range(40):
+        expected.update(c['date'][i], c['high'][i], c['low'][i], c['close'][i])
+    assert state.snapshot() == expected.snapshot()
@@ -0,0 +1,98 @@
+import pytest
+
+from stock_anaylsis_agent.intraday import (IntradayBuffer, MinuteRing, Resampler, latest_session, minute_to_timestamp,
+                                           rows_from_series, timestamp_to_minute)
+
+
+def _minute(stamp: str) -> int:
+    return timestamp_to_minute(stamp)
+
+
+def _bars(start: str, count: int, first_close: float = 100.0):
+    """count consecutive 1-minute bars from start, each closing 1 higher with volume 10"""
+    m = _minute(start)
+    return [(m + i, first_close + i - 0.5, first_close + i + 1, first_close + i - 1, first_close + i, 10)
+            for i in range(count)]
+
+
+def test_ring_overwrites_the_oldest_bar():
+    ring = MinuteRing(capacity=3)
+    for bar in _bars('2024-06-28 09:30', 5):
+        ring.append(bar)
+    assert len(ring) == 3
+    assert [ring.value('close', i) for i in range(3)] == [102.0, 103.0, 104.0]
+    assert ring.value('close', -1) == 104.0
+    start = _minute('2024-06-28 09:30')
+    assert ring.locate(start + 3) == 1
+    assert ring.locate(start + 1) == -1
+    assert ring.locate(start + 10) == 2
+
+
+def test_ingest_skips_old_and_duplicate_minutes():
+    buffer = IntradayBuffer(capacity=16)
+    rows = _bars('2024-06-28 09:30', 5)
+    assert buffer.ingest(rows) == 5
+    assert buffer.ingest(rows) == 0
+    # An overlapping refresh only adds what is newer than the last bar seen
+    assert buffer.ingest(rows[2:] + _bars('2024-06-28 09:35', 2, first_close=105.0)) == 2
+    assert len(buffer) == 7
+    assert buffer.ingest([rows[0]]) == 0
+    assert minute_to_timestamp(buffer.last_minute) == '2024-06-28 09:36'
+
+
+def test_ingest_keeps_only_what_fits_the_ring():
+    buffer = IntradayBuffer(capacity=4)
+    assert buffer.ingest(_bars('2024-06-28 09:30', 10)) == 4
+    assert buffer.ring.value('close', 0) == 106.0
+
+
+@pytest.mark.parametrize('minutes', [5, 15])
+def test_resample_ohlcv_aligned_to_the_open(minutes):
+    resampler = Resampler(minutes, keep=10)
+    for bar in _bars('2024-06-28 09:28', 32):
+        resampler.update(*bar)
+    bars = resampler.bars()
+    # The two pre-open minutes fall in the interval that ends at 09:30
+    assert minute_to_timestamp(bars[0].start) == f'2024-06-28 {"09:25" if minutes == 5 else "09:15"}'
+    assert minute_to_timestamp(bars[1].start) == '2024-06-28 09:30'
+
+    first_full = bars[1]
+    assert first_full.open == 101.5
+    assert first_full.close == 102.0 + minutes - 1
+    assert first_full.high == 102.0 + minutes
+    assert first_full.low == 101.0
+    assert first_full.volume == 10 * minutes
+    assert sum(bar.volume for bar in bars) == 320
+    assert resampler.bars(limit=1) == [bars[-1]]
+
+
+def test_session_cutover():
+    yesterday = _bars('2024-06-27 15:58', 2)
+    pre_market = _bars('2024-06-28 08:00', 2, first_close=50.0)
+    today = _bars('2024-06-28 09:30', 3, first_close=60.0)
+
+    assert latest_session(yesterday + pre_market + today, limit=100) == pre_market + today
+    assert latest_session(yesterday + pre_market + today, limit=2) == today[1:]
+    assert latest_session([], limit=10) == []
+
+    buffer = IntradayBuffer(capacity=64)
+    buffer.ingest(yesterday)
+    assert buffer.change()['previous_date'] == '2024-06-27 15:58'
+    # Before today's open there is no session to measure from
+    buffer.ingest(pre_market)
+    assert buffer.change() is None
+    buffer.ingest(today)
+    since_open = buffer.change()
+    assert since_open['previous_close'] == 59.5
+    assert since_open['current_close'] == 62.0
+    assert since_open['previous_date'] == '2024-06-28 09:30'
+
+
+def test_rows_from_series_sorts_oldest_first():
+    series = {
+        '2024-06-28 09:31:00': {'1. open': '10.5', '2. high': '11', '3. low': '10', '4. close': '10.8', '5. volume': '300'},
+        '2024-06-28 09:30:00': {'1. open': '10', '2. high': '10.6', '3. low': '9.9', '4. close': '10.5', '5. volume': '1e3'}
+    }
+    rows = rows_from_series(series)
+    assert [minute_to_timestamp(row[0]) for row in rows] == ['2024-06-28 09:30', '2024-06-28 09:31']
+    assert rows[0][1:] == (10.0, 10.6, 9.9, 10.5, 1000)
@@ -0,0 +1,65 @@
+import json
+
+from stock_anaylsis_agent.models import DailyBars, decode_bars, decode_value, encode_value
+
+# Abridged TIME_SERIES_DAILY response, in the layout Alpha Vantage sends
+DAILY_PAYLOAD = {
+    'Meta Data': {
+        '1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+        '2. Symbol': 'IBM',
+        '3. Last Refreshed': '2024-06-28',
+        '4. Output Size': 'Compact',
+        '5. Time Zone': 'US/Eastern'
+    },
+    'Time Series (Daily)': {
+        '2024-06-28': {'1. open': '173.4500', '2. high': '174.1200', '3. low': '171.8900', '4. close': '172.9500',
+                       '5. volume': '7201373'},
+        '2024-06-27': {'1. open': '172.2300', '2. high': '173.5900', '3. low': '171.5300', '4. close': '173.3100',
+                       '5. volume': '3165436'},
+        '2024-06-26': {'1. open': '174.9100', '2. high': '175.2000', '3. low': '172.3300', '4. close': '172.2000',
+                       '5. volume': '4136583'}
+    }
+}
+
+
+def _columns(bars: DailyBars):
+    return {name: list(column) for name, column in bars.columns.items()}
+
+
+def _reordered(payload):
+    """The same bars with their fields in reverse order, which the byte regex does not match"""
+    series = {day: dict(reversed(list(bar.items()))) for day, bar in payload['Time Series (Daily)'].items()}
+    return {**payload, 'Time Series (Daily)': series}
+
+
+def test_regex_and_json_paths_decode_identical_columns():
+    fast = decode_bars(json.dumps(DAILY_PAYLOAD, indent=4).encode())
+    compact = decode_bars(json.dumps(DAILY_PAYLOAD, separators=(',', ':')).encode())
+    fallback = decode_bars(json.dumps(_reordered(DAILY_PAYLOAD), indent=4).encode())
+    assert isinstance(fallback, DailyBars)
+    assert _columns(fast) == _columns(compact) == _columns(fallback)
+    assert fast.first_date == '2024-06-26' and fast.last_date == '2024-06-28'
+    assert list(fast.columns['close']) == [172.2, 173.31, 172.95]
+    assert list(fast.columns['volume']) == [4136583, 3165436, 7201373]
+
+
+def test_partly_matching_payload_uses_the_json_path():
+    payload = json.loads(json.dumps(DAILY_PAYLOAD))
+    bar = payload['Time Series (Daily)']['2024-06-27']
+    payload['Time Series (Daily)']['2024-06-27'] = {'4. close': bar['4. close'], **bar}
+    bars = decode_bars(json.dumps(payload, indent=4).encode())
+    assert _columns(bars) == _columns(decode_bars(json.dumps(DAILY_PAYLOAD).encode()))
+
+
+def test_error_and_throttle_payloads_come_back_as_dicts():
+    error = {'Error Message': 'Invalid API call.'}
+    note = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute.'}
+    assert decode_bars(json.dumps(error).encode()) == error
+    assert decode_bars(json.dumps(note).encode()) == note
+    assert decode_bars(b'{}') == {}
+
+
+def test_cached_bars_round_trip():
+    bars = decode_bars(json.dumps(DAILY_PAYLOAD).encode())
+    restored = decode_value(json.loads(json.dumps(encode_value(bars))))
+    assert _columns(restored) == _columns(bars)
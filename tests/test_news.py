@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from stock_anaylsis_agent.news import DUPLICATE_DISTANCE, NewsPipeline, hamming, simhash
+
+HEADLINE = 'Apple beats earnings estimates as iPhone sales climb in China and services revenue hits a record'
+
+
+def _stamp(age: timedelta) -> str:
+    return (datetime.now(timezone.utc) - age).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _raw(title: str, url: str, age: timedelta, source: str = 'Wire') -> dict:
+    return {'title': title, 'description': f'{title}.', 'url': url, 'publishedAt': _stamp(age),
+            'source': {'name': source}}
+
+
+class FakeNewsApi:
+    """Returns queued pages and records the from cursor of every request"""
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.cursors = []
+
+    def __call__(self, query, since, page_size):
+        self.cursors.append(since)
+        return {'status': 'ok', 'articles': self.pages.pop(0)}
+
+
+def test_syndicated_copies_collapse_into_one_story():
+    assert hamming(simhash(HEADLINE), simhash(HEADLINE + ' - Reuters')) <= DUPLICATE_DISTANCE
+    api = FakeNewsApi([
+        _raw(HEADLINE, 'https://a.example/1', timedelta(hours=1), 'Reuters'),
+        _raw(HEADLINE + ' - Reuters', 'https://b.example/1', timedelta(hours=2), 'Yahoo'),
+        _raw(HEADLINE, 'https://c.example/1', timedelta(hours=3), 'MarketWatch'),
+        _raw('Tesla deliveries miss forecasts as price cuts fail to lift demand in Europe', 'https://a.example/2',
+             timedelta(hours=4))
+    ])
+    articles = NewsPipeline(api).articles('AAPL', 'Apple')
+    assert [a.url for a in articles] == ['https://a.example/1', 'https://a.example/2']
+    assert articles[0].duplicates == 2
+    assert articles[1].duplicates == 0
+
+
+def test_refresh_only_asks_for_and_merges_newer_articles():
+    first = [_raw(HEADLINE, 'https://a.example/1', timedelta(hours=5)),
+             _raw('Apple raises dividend and announces a new buyback program', 'https://a.example/2', timedelta(hours=6))]
+    newer = _raw('Analyst upgrade lifts Apple shares ahead of its developer conference', 'https://a.example/3',
+                 timedelta(hours=1))
+    # The API resends the newest known article along with the new one
+    api = FakeNewsApi(first, [newer, first[0]])
+    pipeline = NewsPipeline(api, refresh_interval=0)
+
+    assert len(pipeline.articles('AAPL', 'Apple')) == 2
+    articles = pipeline.articles('aapl', 'Apple')
+    assert api.cursors == [None, first[0]['publishedAt']]
+    assert [a.url for a in articles] == ['https://a.example/3', 'https://a.example/1', 'https://a.example/2']
+    assert articles[1].duplicates == 0
+
+
+def test_refresh_interval_serves_the_cached_articles():
+    api = FakeNewsApi([_raw(HEADLINE, 'https://a.example/1', timedelta(hours=1))])
+    pipeline = NewsPipeline(api, refresh_interval=300)
+    pipeline.articles('AAPL', 'Apple')
+    assert len(pipeline.articles('AAPL', 'Apple')) == 1
+    assert api.cursors == [None]
+
+
+def test_articles_older_than_max_age_are_pruned():
+    api = FakeNewsApi([
+        _raw(HEADLINE, 'https://a.example/1', timedelta(days=6, hours=23)),
+        _raw('Apple faces an antitrust lawsuit over its app store rules', 'https://a.example/2',
+             timedelta(days=7, minutes=5)),
+        _raw('Apple supplier warns of weaker demand for smartphones this quarter', 'https://a.example/3',
+             timedelta(days=30))
+    ])
+    articles = NewsPipeline(api, max_age_days=7).articles('AAPL', 'Apple')
+    assert [a.url for a in articles] == ['https://a.example/1']
+
+
+def test_failed_refresh_serves_what_it_has():
+    api = FakeNewsApi([_raw(HEADLINE, 'https://a.example/1', timedelta(hours=1))])
+    pipeline = NewsPipeline(api, refresh_interval=0)
+    assert len(pipeline.articles('AAPL', 'Apple')) == 1
+    pipeline.fetch_page = lambda query, since, page_size: {'status': 'error', 'message': 'rateLimited'}
+    assert len(pipeline.articles('AAPL', 'Apple')) == 1
+    with pytest.raises(ValueError):
+        pipeline.articles('MSFT', 'Microsoft')
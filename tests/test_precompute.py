@@ -0,0 +1,20 @@
+from stock_anaylsis_agent.precompute import AnalysisPrecomputer
+
+
+def test_lookup_normalizes_timeframe_spellings(monkeypatch):
+    calls = []
+
+    def analyze(ticker, company_name, timeframe):
+        calls.append((ticker, timeframe))
+        return {'status': 'success', 'ticker': ticker, 'timeframe': timeframe}
+
+    precomputer = AnalysisPrecomputer(analyze, lambda ticker: ticker, lambda ticker: '2024-06-28', ['aapl'],
+                                      timeframes=['1week', '1w', '3m'])
+    monkeypatch.setattr(precomputer, '_valid', lambda entry, now: entry is not None)
+    assert precomputer.run_once()['computed'] == 2
+    assert len(calls) == 2
+
+    for spelling in ('1week', '1w', 'week', ' Week '):
+        assert precomputer.lookup('AAPL', spelling) is not None
+    assert precomputer.lookup('aapl', '3months') is not None
+    assert precomputer.lookup('AAPL', '1month') is None
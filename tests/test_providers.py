@@ -0,0 +1,82 @@
+import pytest
+
+from stock_anaylsis_agent.models import Quote
+from stock_anaylsis_agent.providers import Provider, ProviderRouter
+from stock_anaylsis_agent.scheduler import QuotaLimiter, RateLimitedError
+
+
+class FakeProvider(Provider):
+    def __init__(self, name, answer=None, fallback_only=False):
+        super().__init__()
+        self.name = name
+        self.answer = answer
+        self.fallback_only = fallback_only
+        self.calls = 0
+
+    def quote(self, ticker):
+        self.calls += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def test_open_breakers_raise_instead_of_not_found():
+    live = FakeProvider('live', Quote('AAPL', 190.0))
+    live.breaker.trip(30)
+    router = ProviderRouter([live, FakeProvider('csv', None, fallback_only=True)])
+
+    with pytest.raises(RateLimitedError) as excinfo:
+        router.quote('AAPL')
+    assert 25 < excinfo.value.retry_after <= 30
+    assert live.calls == 0
+
+
+def test_every_provider_skipped():
+    a, b = FakeProvider('a'), FakeProvider('b')
+    a.breaker.trip(10)
+    b.breaker.trip(40)
+    with pytest.raises(RateLimitedError) as excinfo:
+        ProviderRouter([a, b]).quote('AAPL')
+    assert 5 < excinfo.value.retry_after <= 10
+
+
+def test_unknown_ticker_is_none_when_everyone_was_asked():
+    router = ProviderRouter([FakeProvider('a'), FakeProvider('csv', fallback_only=True)])
+    assert router.quote('NOPE') is None
+
+
+def test_local_quota_exhaustion_does_not_trip_the_breaker():
+    quota = QuotaLimiter(per_minute=1, per_day=None)
+    quota.acquire()
+
+    class Metered(FakeProvider):
+        def quote(self, ticker):
+            quota.acquire(timeout=0)
+            return Quote(ticker, 1.0)
+
+    provider = Metered('metered')
+    router = ProviderRouter([provider])
+    with pytest.raises(RateLimitedError):
+        router.quote('AAPL')
+    assert provider.breaker.state == 'closed'
+
+
+def test_upstream_throttling_trips_the_breaker():
+    provider = FakeProvider('throttled', RateLimitedError('Note: slow down', retry_after=60, upstream=True))
+    router = ProviderRouter([provider])
+    with pytest.raises(RateLimitedError):
+        router.quote('AAPL')
+    assert provider.breaker.state == 'open'
+
+    # Later calls skip it but still report throttling rather than an unknown ticker
+    with pytest.raises(RateLimitedError) as excinfo:
+        router.quote('AAPL')
+    assert excinfo.value.retry_after > 50
+    assert provider.calls == 1
+
+
+def test_falls_back_when_the_live_provider_is_open():
+    live = FakeProvider('live', Quote('AAPL', 190.0))
+    live.breaker.trip(30)
+    csv = FakeProvider('csv', Quote('AAPL', 189.0), fallback_only=True)
+    assert ProviderRouter([live, csv]).quote('AAPL').price == 189.0
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from stock_anaylsis_agent.returns import (PriceSeries, _shift_months, infer_timeframe, parse_window, returns_matrix,
+                                           validate_windows)
+
+
+def _day(value: str) -> int:
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def _series(start: str, end: str) -> PriceSeries:
+    """Weekday closes from start to end inclusive, 100 upwards"""
+    days = np.arange(_day(start), _day(end) + 1, dtype=np.int64)
+    days = days[np.is_busday(days.astype('datetime64[D]'))]
+    return PriceSeries(days, 100.0 + np.arange(len(days), dtype=np.float64))
+
+
+def test_parse_window_kinds():
+    assert parse_window('1week') == parse_window('1w')
+    assert parse_window('1m').sessions == 19
+    assert parse_window('3m').months == 3
+    assert parse_window('2w').days == 14
+    assert parse_window('1y').months == 12
+    assert parse_window('5d').sessions == 5
+    assert parse_window('90min').label == '90min'
+    assert parse_window('2 hours').label == '2h'
+    assert parse_window('since open').intraday
+    assert parse_window('2024-01-02:2024-06-28').kind == 'range'
+
+
+@pytest.mark.parametrize('spec', ['0d', '2024-06-28:2024-01-02', 'fortnight', ''])
+def test_parse_window_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_window(spec)
+
+
+def test_one_month_is_sessions_but_three_months_is_calendar():
+    series = _series('2024-01-01', '2024-06-28')
+    table = returns_matrix({'A': series}, [parse_window('1m'), parse_window('3m')])
+    one_month = table.result('A', 0)
+    assert one_month['current_date'] == '2024-06-28'
+    assert one_month['previous_close'] == series.closes[-20]
+    # 2024-03-28 was a Thursday, so 3m starts on that exact date
+    assert table.result('A', 1)['previous_date'] == '2024-03-28'
+
+
+@pytest.mark.parametrize('day, months, expected', [
+    ('2024-03-31', 1, '2024-02-29'),
+    ('2023-03-31', 1, '2023-02-28'),
+    ('2024-05-31', 3, '2024-02-29'),
+    ('2024-01-15', 1, '2023-12-15'),
+    ('2024-07-31', 1, '2024-06-30'),
+    ('2024-02-29', 12, '2023-02-28')
+])
+def test_shift_months_clips_to_month_end(day, months, expected):
+    shifted = _shift_months(np.array([_day(day)], dtype=np.int64), months)
+    assert str(np.datetime64(int(shifted[0]), 'D')) == expected
+
+
+def test_ytd_on_first_session_of_the_year():
+    series = _series('2023-12-20', '2024-01-02')
+    result = returns_matrix({'A': series}, [parse_window('ytd')]).result('A')
+    assert result['previous_date'] == '2023-12-29'
+    assert result['current_date'] == '2024-01-02'
+
+
+def test_ytd_without_prior_year_close():
+    series = _series('2024-01-02', '2024-02-01')
+    assert returns_matrix({'A': series}, [parse_window('ytd')]).result('A') is None
+
+
+def test_empty_series_and_no_tickers():
+    empty = PriceSeries(np.empty(0, np.int64), np.empty(0, np.float64))
+    table = returns_matrix({'A': empty, 'B': _series('2024-01-01', '2024-01-31')}, [parse_window('1d')])
+    assert table.result('A') is None
+    assert table.result('B') is not None
+    assert table.percent_rows()[0] == {'ticker': 'A', 'daily': None}
+
+    table = returns_matrix({}, [parse_window('1d'), parse_window('1y')])
+    assert table.percent.shape == (0, 2)
+    assert table.percent_rows() == []
+
+
+def test_insufficient_history():
+    series = _series('2024-01-01', '2024-01-03')
+    table = returns_matrix({'A': series}, [parse_window('1d'), parse_window('1w'), parse_window('1y')])
+    assert table.result('A', 0)['price_change'] == pytest.approx(1.0)
+    assert table.result('A', 1) is None
+    assert table.result('A', 2) is None
+
+
+def test_range_outside_the_data():
+    series = _series('2024-01-01', '2024-06-28')
+    windows = [parse_window('2010-01-04:2010-06-30'), parse_window('2025-01-02:2025-02-03'),
+               parse_window('2023-06-01:2024-02-01'), parse_window('2024-02-01:2024-03-01')]
+    table = returns_matrix({'A': series}, windows)
+    assert table.result('A', 0) is None
+    assert table.result('A', 1) is None
+    # A start before the first bar has no close to measure from
+    assert table.result('A', 2) is None
+    inside = table.result('A', 3)
+    assert (inside['previous_date'], inside['current_date']) == ('2024-02-01', '2024-03-01')
+
+
+def test_rows_are_independent():
+    short = _series('2024-06-24', '2024-06-28')
+    long = _series('2023-01-02', '2024-06-28')
+    table = returns_matrix({'S': short, 'L': long}, [parse_window('1w'), parse_window('1y')])
+    assert table.result('S', 0) is not None
+    assert table.result('S', 1) is None
+    assert table.result('L', 1)['previous_date'] == '2023-06-28'
+
+
+def test_intraday_windows_are_rejected():
+    with pytest.raises(ValueError):
+        returns_matrix({}, [parse_window('1h')])
+    with pytest.raises(ValueError, match='since open'):
+        validate_windows([parse_window('1w'), parse_window('since open')])
+    validate_windows([parse_window(w) for w in ('1d', '3m', 'ytd', '2024-01-02:2024-06-28')])
+
+
+@pytest.mark.parametrize('query,expected', [
+    ('How did AAPL do over the last 3 months?', '3months'),
+    ('NVDA price 5 days ago', '5days'),
+    ('TSLA from 2024-01-02 to 2024-06-28', '2024-01-02:2024-06-28'),
+    ('MSFT year to date', 'ytd'),
+    ('Why did NVDA drop this week?', '1week'),
+    ('Is AAPL above its 200 day moving average?', '1week'),
+    ('TSLA 50-day MA', '1week'),
+    ('NVDA 14 day RSI this month', '1month'),
+    ('200-day sma over the past year', '1y'),
+    ('200 day moving average over the last 3 months', '3months')
+])
+def test_infer_timeframe(query, expected):
+    assert infer_timeframe(query) == expected
+
+
+def test_infer_timeframe_today_depends_on_the_session():
+    assert infer_timeframe('How is Tesla doing today?', market_open=True) == 'since open'
+    assert infer_timeframe('How is Tesla doing today?', market_open=False) == '1day'
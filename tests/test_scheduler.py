@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from stock_anaylsis_agent.scheduler import QuotaLimiter, RateLimitedError, RequestScheduler, SlidingWindow
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_daily_quota_grants_per_day_calls_over_24_hours():
+    clock = FakeClock()
+    quota = QuotaLimiter(per_minute=5, per_day=25, clock=clock)
+    granted = []
+    # One attempt a minute for a whole day
+    for _ in range(24 * 60):
+        try:
+            quota.acquire()
+            granted.append(clock.now)
+        except RateLimitedError:
+            pass
+        clock.now += 60
+    assert len(granted) == 25
+    # The first call is now a full day old, so its slot is free again
+    assert quota.remaining_today == 1
+
+
+def test_daily_quota_frees_slots_24_hours_after_each_call():
+    clock = FakeClock()
+    quota = QuotaLimiter(per_minute=100, per_day=3, clock=clock)
+    for _ in range(3):
+        quota.acquire()
+    with pytest.raises(RateLimitedError) as excinfo:
+        quota.acquire()
+    assert excinfo.value.retry_after == pytest.approx(24 * 3600)
+
+    clock.now += 24 * 3600 - 1
+    assert quota.remaining_today == 0
+    clock.now += 1
+    assert quota.remaining_today == 3
+    quota.acquire()
+    assert quota.remaining_today == 2
+
+
+def test_minute_timeout_gives_the_daily_slot_back():
+    clock = FakeClock()
+    quota = QuotaLimiter(per_minute=1, per_day=10, clock=clock)
+    quota.acquire()
+    with pytest.raises(RateLimitedError):
+        quota.acquire(timeout=0)
+    assert quota.remaining_today == 9
+
+
+def test_no_daily_cap():
+    quota = QuotaLimiter(per_minute=60, per_day=None)
+    quota.acquire()
+    assert quota.day is None
+    assert quota.remaining_today is None
+
+
+def test_sliding_window_wait_until_oldest_call_expires():
+    clock = FakeClock()
+    window = SlidingWindow(2, 100.0, clock)
+    assert window.try_acquire() == 0
+    clock.now += 30
+    assert window.try_acquire() == 0
+    assert window.try_acquire() == pytest.approx(70)
+    clock.now += 70
+    assert window.try_acquire() == 0
+    assert window.available == 0
+
+
+def test_long_waits_are_reported_instead_of_requeued():
+    calls = []
+
+    def handler(ticker):
+        calls.append(ticker)
+        wait = 3600.0 if ticker == 'DAILY' else 0.01
+        return {'status': 'error', 'throttled': len(calls) < 3, 'retry_after': wait}
+
+    scheduler = RequestScheduler(handler, workers=1, max_requeue_wait=60.0)
+    try:
+        scheduler.submit('DAILY', 'DAILY')
+        key, result = next(scheduler.results())
+        assert key == 'DAILY' and result['throttled']
+        assert calls == ['DAILY']
+
+        # Short waits are still sat out
+        scheduler.submit('MINUTE', 'MINUTE')
+        assert [key for key, _ in scheduler.results()] == ['MINUTE']
+        assert calls == ['DAILY', 'MINUTE', 'MINUTE']
+    finally:
+        scheduler.close()
+
+
+def test_batch_reports_a_spent_daily_quota_right_away(monkeypatch):
+    from stock_anaylsis_agent import agent
+
+    calls = []
+
+    def throttled(ticker, company_name, timeframe):
+        calls.append(ticker)
+        return agent._throttled_error(RateLimitedError('daily quota spent', retry_after=6 * 3600))
+
+    monkeypatch.setattr(agent, 'ticker_analysis', throttled)
+    started = time.monotonic()
+    results = list(agent.ticker_analysis_batch(['AAPL', 'MSFT']))
+    assert time.monotonic() - started < 5
+    assert sorted(r['ticker'] for r in results) == ['AAPL', 'MSFT']
+    assert all(r['status'] == 'error' and r['throttled'] for r in results)
+    assert sorted(calls) == ['AAPL', 'MSFT']
@@ -0,0 +1,45 @@
+from array import array
+
+from stock_anaylsis_agent import agent
+from stock_anaylsis_agent.models import DailyBars, date_to_day
+from stock_anaylsis_agent.store import BarStore
+
+
+def _bars(*rows) -> DailyBars:
+    """DailyBars from (date, close) pairs"""
+    return DailyBars({
+        'date': array('i', [date_to_day(d) for d, _ in rows]),
+        'open': array('d', [c for _, c in rows]),
+        'high': array('d', [c for _, c in rows]),
+        'low': array('d', [c for _, c in rows]),
+        'close': array('d', [c for _, c in rows]),
+        'volume': array('q', [1000] * len(rows))
+    })
+
+
+def test_append_only_writes_newer_bars(tmp_path):
+    store = BarStore(str(tmp_path))
+    assert store.append('zzz', _bars(('2026-10-14', 100.0), ('2026-10-15', 101.0))) == 2
+    assert store.append('ZZZ', _bars(('2026-10-15', 999.0), ('2026-10-16', 102.0))) == 1
+    bars = store.load('ZZZ')
+    assert list(bars.columns['close']) == [100.0, 101.0, 102.0]
+    assert bars.last_date == '2026-10-16'
+
+
+def test_sync_during_the_session_skips_the_unfinished_bar(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent, 'bar_store', BarStore(str(tmp_path)))
+    monkeypatch.setattr(agent.market_data, 'providers', [object()])
+    upstream = {'series': _bars(('2026-10-14', 100.0), ('2026-10-15', 101.0), ('2026-10-16', 95.0))}
+    monkeypatch.setattr(agent, '_daily_series', lambda ticker, outputsize: upstream['series'])
+
+    # Friday 2026-10-16 mid-session: the last published bar is Thursday's
+    monkeypatch.setattr(agent, 'last_published_session', lambda: '2026-10-15')
+    bars = agent.sync_daily_bars('ZZZ')
+    assert bars.last_date == '2026-10-15'
+
+    # After the close the finished bar is stored with its official close
+    upstream['series'] = _bars(('2026-10-15', 101.0), ('2026-10-16', 110.0))
+    monkeypatch.setattr(agent, 'last_published_session', lambda: '2026-10-16')
+    bars = agent.sync_daily_bars('ZZZ')
+    assert bars.last_date == '2026-10-16'
+    assert bars.columns['close'][-1] == 110.0
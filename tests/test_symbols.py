@@ -0,0 +1,76 @@
+import pytest
+
+from stock_anaylsis_agent.symbols import ALIASES, DEFAULT_LISTINGS_PATH, SymbolIndex, normalize_name, read_listings
+
+
+@pytest.fixture(scope='module')
+def index() -> SymbolIndex:
+    return SymbolIndex(read_listings(DEFAULT_LISTINGS_PATH), ALIASES)
+
+
+def test_normalize_name():
+    assert normalize_name('Coca-Cola Co') == ['coca', 'cola']
+    assert normalize_name('Alphabet Inc - Class A') == ['alphabet']
+    assert normalize_name('Group') == ['group']
+
+
+@pytest.mark.parametrize('query,symbol,match_type', [
+    ('How is Tesla doing today?', 'TSLA', 'name'),
+    ('Why did NVDA drop this week?', 'NVDA', 'ticker'),
+    ('what about $pltr', 'PLTR', 'ticker'),
+    ('nvda earnings', 'NVDA', 'ticker'),
+    ('Facebook news', 'META', 'name'),
+    ('Bank of America stock', 'BAC', 'name'),
+    ('Coca-Cola dividend', 'KO', 'name'),
+    ('Goldman Sachs results', 'GS', 'name'),
+    ('amazn earnings', 'AMZN', 'fuzzy'),
+    ('Analyze Microsfot', 'MSFT', 'fuzzy')
+])
+def test_resolve(index, query, symbol, match_type):
+    match = index.resolve(query)
+    assert (match.symbol, match.match_type) == (symbol, match_type)
+
+
+def test_longest_name_wins(index):
+    # 'General' alone names nothing; 'General Motors' is one company
+    assert index.resolve('general motors outlook').symbol == 'GM'
+    assert index.resolve('general market news') is None
+
+
+@pytest.mark.parametrize('query', [
+    'Is it a good time to buy?',
+    'IT stocks are up',
+    'ON the other hand',
+    'ALL of them',
+    'what is the price of a stock',
+    'being lower than investors hoped',
+    'new highs for american stocks'
+])
+def test_common_words_are_not_companies(index, query):
+    assert index.resolve(query) is None
+    assert index.resolve_all(query) == []
+
+
+def test_common_words_that_are_real_listings():
+    index = SymbolIndex([('ON', 'ON Semiconductor Corp'), ('IT', 'Gartner Inc'), ('ALL', 'Allstate Corp')])
+    assert index.resolve('ON the other hand, IT is all up') is None
+    assert index.resolve('$ALL earnings').symbol == 'ALL'
+    assert index.resolve('Allstate earnings').symbol == 'ALL'
+
+
+@pytest.mark.parametrize('query,symbols', [
+    ('JPM vs GS', ['JPM', 'GS']),
+    ('Compare Google and Amazon', ['GOOGL', 'AMZN']),
+    ('tesla, apple / nvidia', ['TSLA', 'AAPL', 'NVDA']),
+    ('ford versus general motors', ['F', 'GM']),
+    # Names containing a separator stay whole
+    ('Bank of America stock', ['BAC']),
+    ('Johnson & Johnson news', ['JNJ']),
+    ('Tesla and the market', ['TSLA'])
+])
+def test_resolve_all_splits_comparisons(index, query, symbols):
+    assert [match.symbol for match in index.resolve_all(query)] == symbols
+
+
+def test_resolve_all_limit(index):
+    assert len(index.resolve_all('AAPL, MSFT, NVDA, TSLA', limit=2)) == 2
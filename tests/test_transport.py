@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from stock_anaylsis_agent import transport as transport_module
+from stock_anaylsis_agent.transport import HttpTransport, TransportError
+
+
+@pytest.fixture
+def flaky_server():
+    """Answers 503 to the first `failures` requests, then a small JSON body"""
+    state = {'failures': 2, 'requests': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'] += 1
+            if state['requests'] <= state['failures']:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.dumps({'ok': True}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/query', state
+    server.shutdown()
+
+
+def test_every_attempt_is_metered(flaky_server):
+    url, state = flaky_server
+    attempts = []
+    transport = HttpTransport(backoff_base=0.01)
+    assert transport.get(url, before_attempt=attempts.append, budget=5).json() == {'ok': True}
+    assert len(attempts) == state['requests'] == 3
+    assert all(0 < left <= 10 for left in attempts)
+
+
+@pytest.mark.parametrize('use_httpx', [True, False])
+def test_async_client_shares_the_metering(flaky_server, monkeypatch, use_httpx):
+    if not use_httpx:
+        monkeypatch.setattr(transport_module, 'httpx', None)
+    elif transport_module.httpx is None:
+        pytest.skip('httpx is not installed')
+    url, state = flaky_server
+    attempts = []
+    transport = HttpTransport(backoff_base=0.01)
+
+    async def fetch():
+        try:
+            return await transport.get_json_async(url, before_attempt=attempts.append, budget=5)
+        finally:
+            await transport.aclose()
+
+    assert asyncio.run(fetch()) == {'ok': True}
+    assert len(attempts) == state['requests'] == 3
+
+
+def test_async_client_stops_when_metering_refuses(flaky_server):
+    url, state = flaky_server
+
+    def refuse(left):
+        raise TransportError('no quota')
+
+    transport = HttpTransport()
+
+    async def fetch():
+        try:
+            return await transport.get_json_async(url, before_attempt=refuse)
+        finally:
+            await transport.aclose()
+
+    with pytest.raises(TransportError):
+        asyncio.run(fetch())
+    assert state['requests'] == 0
@@ -0,0 +1,54 @@
+import time
+
+from stock_anaylsis_agent import watchlist as watchlist_module
+from stock_anaylsis_agent.models import Quote
+from stock_anaylsis_agent.scheduler import QuotaLimiter
+from stock_anaylsis_agent.watchlist import WatchlistPoller
+
+
+def _poller(**kwargs) -> WatchlistPoller:
+    return WatchlistPoller(lambda ticker: None, ['AAPL', 'MSFT', 'NVDA'], QuotaLimiter(5, 25), **kwargs)
+
+
+def test_session_quotes_older_than_max_age_are_not_live(monkeypatch):
+    monkeypatch.setattr(watchlist_module, 'is_market_open', lambda: True)
+    poller = _poller(max_age=60)
+    # The default budget polls each ticker only every half hour or so
+    assert poller.cycle_seconds > 3600
+    assert not poller.polls_session
+
+    poller.table['AAPL'] = Quote('AAPL', 190.0, fetched_at=time.time() - 30)
+    poller.table['MSFT'] = Quote('MSFT', 410.0, fetched_at=time.time() - 600)
+    assert poller.lookup('aapl').price == 190.0
+    assert poller.lookup('MSFT') is None
+    assert poller.lookup('NVDA') is None
+
+
+def test_quote_reports_its_age():
+    result = Quote('AAPL', 190.0, fetched_at=time.time() - 42).to_dict(source='watchlist')
+    assert 41 <= result['age_seconds'] <= 43
+    assert result['as_of'].endswith('+00:00')
+    assert result['source'] == 'watchlist'
+
+
+def test_session_polling_is_skipped_when_quotes_would_be_too_old(monkeypatch):
+    monkeypatch.setattr(watchlist_module, 'is_market_open', lambda: True)
+    fetched = []
+
+    def fetch(ticker):
+        fetched.append(ticker)
+        return Quote(ticker, 1.0)
+
+    slow = WatchlistPoller(fetch, ['AAPL', 'MSFT', 'NVDA'], QuotaLimiter(5, 25), max_age=60)
+    slow.start()
+    time.sleep(0.2)
+    slow.stop()
+    assert fetched == []
+
+    fast = WatchlistPoller(fetch, ['AAPL', 'MSFT'], QuotaLimiter(6000, None), max_age=60)
+    assert fast.polls_session
+    fast.start()
+    time.sleep(0.2)
+    fast.stop()
+    assert {'AAPL', 'MSFT'} <= set(fetched)
+    assert fast.lookup('AAPL') is not None